@@ -1,13 +1,30 @@
 # __init__.py
-from . import bot
-from . import processor
-from . import insights
-from . import store
+# Submodules and exports are resolved on first access, so ``import app`` does
+# not load the embedding model, sklearn or pandas, or create data directories
+import importlib
 
 __version__ = "0.1.0"
 
-# Export key functions for easier imports
-from .bot import process_message, add_company_knowledge
-from .processor import process_document, process_webpage  # Changed from process_documents
-from .insights import get_analytics
-from .store import save_data, get_data
\ No newline at end of file
+# Export key functions for easier imports (name -> defining submodule)
+_EXPORTS = {
+    'process_message': 'bot',
+    'add_company_knowledge': 'bot',
+    'process_document': 'processor',
+    'process_webpage': 'processor',  # Changed from process_documents
+    'get_analytics': 'insights',
+    'save_data': 'store',
+    'get_data': 'store',
+}
+_SUBMODULES = ('bot', 'processor', 'insights', 'store')
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS) + list(_SUBMODULES))
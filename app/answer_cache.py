@@ -0,0 +1,156 @@
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+import time
+import numpy as np
+
+class _TenantAnswers:
+    """One company's cached answers, valid for a single index version"""
+
+    def __init__(self, version: str):
+        self.version = version
+        self.entries: 'OrderedDict[int, Dict]' = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None  # Rows follow ``_keys``
+        self._keys = []
+
+    def matrix(self) -> Tuple[np.ndarray, list]:
+        """Stacked query embeddings, rebuilt only after entries change"""
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            self._matrix = (np.stack([self.entries[key]['embedding'] for key in self._keys])
+                            if self._keys else np.empty((0, 0), dtype=np.float32))
+        return self._matrix, self._keys
+
+    def changed(self):
+        self._matrix = None
+
+class SemanticAnswerCache:
+    """Per-company cache of answers, looked up by query-embedding similarity.
+
+    A query whose embedding has cosine similarity of at least ``threshold``
+    with a recently answered one gets that answer (response, confidence,
+    context, source) without retrieval or an LLM call. Entries expire after
+    ``ttl_seconds`` and each company keeps its ``max_entries`` most recently
+    used ones. Entries are tied to the index version they were answered
+    from, so any change to a company's documents drops its cache.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600.0,
+                 max_entries: int = 256, max_tenants: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_tenants = max_tenants
+        self._tenants: 'OrderedDict[str, _TenantAnswers]' = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+        # Counters for monitoring
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.saved_llm_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32)
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+    def _tenant(self, company_id: str, version: str, create: bool) -> Optional[_TenantAnswers]:
+        """The company's answers for ``version``, dropping older ones (lock held)"""
+        tenant = self._tenants.get(company_id)
+        if tenant is not None and tenant.version != version:
+            del self._tenants[company_id]
+            self.invalidations += 1
+            tenant = None
+        if tenant is None and create:
+            tenant = self._tenants[company_id] = _TenantAnswers(version)
+            while len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+        if tenant is not None:
+            self._tenants.move_to_end(company_id)
+        return tenant
+
+    def get(self, company_id: str, version: str,
+            embedding: np.ndarray) -> Optional[Tuple[str, float, str, str]]:
+        """Cached (response, confidence, context, source) for a similar query, or None"""
+        if not self.enabled:
+            return None
+
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            tenant = self._tenant(company_id, version, create=False)
+            if tenant is not None and tenant.entries:
+                matrix, keys = tenant.matrix()
+                similarities = matrix @ query
+                for row in np.argsort(-similarities):
+                    if similarities[row] < self.threshold:
+                        break
+                    entry = tenant.entries[keys[row]]
+                    if now - entry['created'] > self.ttl_seconds:
+                        continue  # Expired; dropped below
+                    tenant.entries.move_to_end(keys[row])
+                    self.hits += 1
+                    self.saved_llm_seconds += entry['llm_seconds']
+                    return entry['answer']
+
+                expired = [key for key, entry in tenant.entries.items()
+                           if now - entry['created'] > self.ttl_seconds]
+                if expired:
+                    for key in expired:
+                        del tenant.entries[key]
+                    tenant.changed()
+            self.misses += 1
+            return None
+
+    def put(self, company_id: str, version: str, embedding: np.ndarray,
+            answer: Tuple[str, float, str, str], llm_seconds: float):
+        """Cache an answer produced from index ``version`` and how long the LLM took"""
+        if not self.enabled:
+            return
+
+        entry = {'embedding': self._normalize(embedding), 'answer': answer,
+                 'created': time.time(), 'llm_seconds': llm_seconds}
+        with self._lock:
+            tenant = self._tenant(company_id, version, create=True)
+            # Concurrent misses on one question replace its entry rather than pile up
+            if tenant.entries:
+                matrix, keys = tenant.matrix()
+                similarities = matrix @ entry['embedding']
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    del tenant.entries[keys[best]]
+            tenant.entries[self._next_key] = entry
+            self._next_key += 1
+            while len(tenant.entries) > self.max_entries:
+                tenant.entries.popitem(last=False)
+                self.evictions += 1
+            tenant.changed()
+
+    def invalidate(self, company_id: str):
+        """Drop all cached answers of a company"""
+        with self._lock:
+            if self._tenants.pop(company_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict:
+        """Hit rate and LLM time saved"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "tenants": len(self._tenants),
+                "entries": sum(len(tenant.entries) for tenant in self._tenants.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "saved_llm_ms": self.saved_llm_seconds * 1000,
+                "avg_saved_llm_ms": self.saved_llm_seconds * 1000 / self.hits if self.hits else 0.0
+            }
@@ -0,0 +1,142 @@
+from typing import Any, Callable, Dict, List, Tuple
+from concurrent.futures import Future, InvalidStateError
+import queue
+import threading
+import time
+import numpy as np
+
+def collect_batch(items: queue.Queue, max_batch_size: int, max_wait_ms: float,
+                  accept: Callable[[Any], bool] = lambda item: True) -> List:
+    """Wait for the first accepted item, then gather more until the deadline.
+
+    Returns once ``max_batch_size`` items are accepted or ``max_wait_ms``
+    have passed since the first one; ``accept`` can drop stale items.
+    """
+    batch = []
+    while not batch:
+        item = items.get()
+        if accept(item):
+            batch.append(item)
+    deadline = time.perf_counter() + max_wait_ms / 1000
+    while len(batch) < max_batch_size:
+        remaining = deadline - time.perf_counter()
+        try:
+            item = items.get(timeout=remaining) if remaining > 0 else items.get_nowait()
+        except queue.Empty:
+            break
+        if accept(item):
+            batch.append(item)
+    return batch
+
+def _resolve(setter: Callable, value):
+    """Complete a claimed future, tolerating one that was already resolved"""
+    try:
+        setter(value)
+    except InvalidStateError:
+        pass
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text encode requests into batched calls.
+
+    Callers block in ``embed`` while a worker thread collects requests for
+    up to ``max_wait_ms`` after the first one arrives, or until
+    ``max_batch_size`` are queued, then encodes them with one call. Larger
+    windows raise throughput under load at the cost of up to ``max_wait_ms``
+    extra latency per query; ``max_batch_size <= 1`` or ``max_wait_ms <= 0``
+    encodes every request directly.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: 'queue.Queue[Tuple[str, Future, float]]' = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # Counters for monitoring
+        self.batches = 0
+        self.queries = 0
+        self.largest_batch = 0
+        self.queue_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch_size > 1 and self.max_wait_ms > 0
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embedding of one text, computed in a shared batch when enabled"""
+        if not self.enabled:
+            self._record(1, 0.0)
+            return self.encode([text])[0]
+
+        return self.submit(text).result()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for the next batch; the future resolves to its embedding.
+
+        Lets async callers await the batch (via ``asyncio.wrap_future``)
+        without holding a thread. Requires batching to be enabled.
+        """
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use"""
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='embedding-batcher',
+                                                    daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        # Nothing may end this thread: every later embed would wait on it forever
+        while True:
+            try:
+                self._run_batch(self._collect())
+            except Exception as e:
+                print(f"Embedding batcher error: {str(e)}")
+
+    def _collect(self) -> List[Tuple[str, Future, float]]:
+        """Next batch of requests, skipping any their callers already cancelled"""
+        return collect_batch(self._queue, self.max_batch_size, self.max_wait_ms,
+                             accept=lambda item: item[1].set_running_or_notify_cancel())
+
+    def _run_batch(self, batch: List[Tuple[str, Future, float]]):
+        started = time.perf_counter()
+        self._record(len(batch), sum(started - queued for _, _, queued in batch))
+        try:
+            embeddings = self.encode([text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                _resolve(future.set_exception, e)
+            return
+        for (_, future, _), embedding in zip(batch, embeddings):
+            _resolve(future.set_result, embedding)
+
+    def _record(self, size: int, queue_seconds: float):
+        with self._stats_lock:
+            self.batches += 1
+            self.queries += size
+            self.largest_batch = max(self.largest_batch, size)
+            self.queue_seconds += queue_seconds
+
+    def stats(self) -> Dict:
+        """Batch size and queueing delay counters"""
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "batches": self.batches,
+                "queries": self.queries,
+                "average_batch_size": self.queries / self.batches if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "average_queue_ms": (self.queue_seconds * 1000 / self.queries
+                                     if self.queries else 0.0)
+            }
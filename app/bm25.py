@@ -0,0 +1,258 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter
+import math
+import sys
+import numpy as np
+from scipy import sparse
+
+class SparseBM25:
+    """BM25 backed by an integer vocabulary and a CSR term-document matrix.
+
+    Scores match ``rank_bm25.BM25Okapi`` (ATIRE idf with an epsilon floor
+    for negative idf values). The term-frequency part of every posting is
+    precomputed, so scoring a query is one sparse vector-matrix product that
+    only touches the posting lists of the query terms.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, weights: sparse.csr_matrix,
+                 doc_len: np.ndarray, avgdl: float, k1: float = 1.5, b: float = 0.75,
+                 epsilon: float = 0.25):
+        self.vocabulary = vocabulary  # term -> row in ``weights``
+        self.idf = idf                # per-term idf, already floored
+        self.weights = weights        # (terms x docs) tf * (k1 + 1) / (tf + k1 * norm)
+        self.doc_len = doc_len
+        self.avgdl = avgdl
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self._max_weights: Optional[np.ndarray] = None  # per-term upper bounds, built lazily
+
+    @property
+    def corpus_size(self) -> int:
+        return self.weights.shape[1]
+
+    @classmethod
+    def build(cls, corpus: Iterable[List[str]], k1: float = 1.5, b: float = 0.75,
+              epsilon: float = 0.25) -> 'SparseBM25':
+        """Index a tokenized corpus"""
+        return cls._from_term_frequencies((Counter(tokens) for tokens in corpus), k1, b, epsilon)
+
+    @classmethod
+    def _from_term_frequencies(cls, doc_freqs: Iterable[Dict[str, int]], k1: float,
+                               b: float, epsilon: float) -> 'SparseBM25':
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        doc_len: List[int] = []
+
+        for doc_id, frequencies in enumerate(doc_freqs):
+            doc_len.append(sum(frequencies.values()))
+            for term, tf in frequencies.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        n_docs = len(doc_len)
+        doc_len_arr = np.array(doc_len, dtype=np.float64)
+        avgdl = float(doc_len_arr.sum() / n_docs) if n_docs else 0.0
+
+        # Documents are visited in order, so every posting list is sorted by doc id
+        term_ids_arr = np.array(term_ids, dtype=np.int64)
+        doc_ids_arr = np.array(doc_ids, dtype=np.int64)
+        tf_arr = np.array(tfs, dtype=np.float64)
+        norm = k1 * (1 - b + b * doc_len_arr[doc_ids_arr] / avgdl) if avgdl else k1 * (1 - b)
+        weights = sparse.csr_matrix(
+            (tf_arr * (k1 + 1) / (tf_arr + norm), (term_ids_arr, doc_ids_arr)),
+            shape=(len(vocabulary), n_docs)
+        )
+        weights.sort_indices()
+
+        # Same idf as BM25Okapi, computed with math.log so values are bit-identical
+        df = np.diff(weights.indptr)
+        idf = np.array([math.log(n_docs - d + 0.5) - math.log(d + 0.5) for d in df],
+                       dtype=np.float64)
+        if len(idf):
+            idf[idf < 0] = epsilon * (idf.sum() / len(idf))
+
+        return cls(vocabulary, idf, weights, doc_len_arr, avgdl, k1, b, epsilon)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index, vocabulary included"""
+        vocabulary = sys.getsizeof(self.vocabulary) + sum(sys.getsizeof(term) for term in self.vocabulary)
+        return (vocabulary + self.idf.nbytes + self.doc_len.nbytes + self.weights.data.nbytes +
+                self.weights.indices.nbytes + self.weights.indptr.nbytes)
+
+    def query_vector(self, query: List[str]) -> sparse.csr_matrix:
+        """Sparse (1 x terms) vector of idf weights; repeated tokens count again"""
+        counts = Counter(self.vocabulary[token] for token in query if token in self.vocabulary)
+        term_ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = self.idf[term_ids] * np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        return sparse.csr_matrix((values, (np.zeros(len(counts), dtype=np.int64), term_ids)),
+                                 shape=(1, len(self.vocabulary)))
+
+    def get_scores(self, query: List[str]) -> np.ndarray:
+        """BM25 score of every document for a tokenized query"""
+        return (self.query_vector(query) @ self.weights).toarray()[0]
+
+    def get_batch_scores(self, query: List[str], doc_ids: np.ndarray) -> np.ndarray:
+        """BM25 scores for a sorted array of doc ids only"""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        scores = np.zeros(len(doc_ids), dtype=np.float64)
+        for term_id, weight in self._query_terms(query):
+            docs, postings = self._postings(term_id)
+            _accumulate(scores, doc_ids, docs, postings, weight)
+        return scores
+
+    def top_k(self, query: List[str], k: int, exclude: Optional[np.ndarray] = None,
+              dense_ratio: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k documents by BM25 using MaxScore-style dynamic pruning.
+
+        Terms are processed from the highest to the lowest score upper bound.
+        New documents are admitted only while the upper bounds of the
+        remaining terms could still lift an unseen document above the current
+        k-th best score; after that the remaining (typically long, low-idf)
+        posting lists are only probed for the surviving candidates, and
+        candidates that can no longer reach the threshold are dropped.
+        Documents flagged in ``exclude`` are never returned. Returns
+        ``(doc_ids, scores)`` sorted by descending score, zero scores omitted.
+
+        Queries whose posting lists together exceed ``dense_ratio`` times the
+        corpus size are scored densely instead, which is cheaper at that point.
+        """
+        terms = self._query_terms(query)
+        total_postings = sum(self.weights.indptr[term_id + 1] - self.weights.indptr[term_id]
+                             for term_id, _ in terms)
+        if (any(weight < 0 for _, weight in terms) or
+                total_postings > dense_ratio * self.corpus_size):
+            # Pruning relies on non-negative contributions and pays off only for
+            # selective queries; otherwise one sparse product is faster
+            scores = self.get_scores(query)
+            if exclude is not None:
+                scores[exclude] = 0
+            return _top_k(np.arange(len(scores)), scores, k)
+
+        upper_bounds = np.array([weight * self._max_weight(term_id) for term_id, weight in terms])
+        order = np.argsort(-upper_bounds, kind='stable')
+        # remaining[j]: most a document can still gain after the j-th processed term
+        remaining = np.append(np.cumsum(upper_bounds[order][::-1])[::-1][1:], 0.0)
+        remaining *= 1 + 1e-9  # keep the bound safe against rounding
+
+        cand_docs = np.zeros(0, dtype=np.int64)
+        cand_scores = np.zeros(0, dtype=np.float64)
+        admitting = True
+
+        for step, i in enumerate(order):
+            term_id, weight = terms[i]
+            docs, postings = self._postings(term_id)
+
+            if admitting:
+                contributions = weight * postings
+                if exclude is not None:
+                    keep = ~exclude[docs]
+                    docs, contributions = docs[keep], contributions[keep]
+                if len(cand_docs) == 0:
+                    cand_docs, cand_scores = docs.astype(np.int64), contributions.copy()
+                else:
+                    # Both lists are sorted: add to known candidates, merge in new ones
+                    known, positions = _lookup(cand_docs, docs)
+                    cand_scores[positions] += contributions[known]
+                    insert_at = np.searchsorted(cand_docs, docs[~known])
+                    cand_docs = np.insert(cand_docs, insert_at, docs[~known])
+                    cand_scores = np.insert(cand_scores, insert_at, contributions[~known])
+            else:
+                _accumulate(cand_scores, cand_docs, docs, postings, weight)
+
+            if len(cand_docs) >= k:
+                threshold = np.partition(cand_scores, len(cand_scores) - k)[len(cand_scores) - k]
+                # Unseen documents can score at most ``remaining`` from here on
+                admitting = admitting and remaining[step] > threshold
+                if not admitting:
+                    alive = cand_scores + remaining[step] >= threshold
+                    cand_docs, cand_scores = cand_docs[alive], cand_scores[alive]
+
+        return _top_k(cand_docs, cand_scores, k)
+
+    def _query_terms(self, query: List[str]) -> List[Tuple[int, float]]:
+        """(term id, idf * query count) for every known query term"""
+        counts = Counter(self.vocabulary[token] for token in query if token in self.vocabulary)
+        return [(term_id, float(self.idf[term_id] * count)) for term_id, count in counts.items()]
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Doc ids (sorted) and precomputed weights of one term's posting list"""
+        start, end = self.weights.indptr[term_id], self.weights.indptr[term_id + 1]
+        return self.weights.indices[start:end], self.weights.data[start:end]
+
+    def _max_weight(self, term_id: int) -> float:
+        """Largest precomputed posting weight of a term (its score upper bound / idf)"""
+        if self._max_weights is None:
+            self._max_weights = np.zeros(self.weights.shape[0], dtype=np.float64)
+            nonempty = np.diff(self.weights.indptr) > 0
+            if nonempty.any():
+                self._max_weights[nonempty] = np.maximum.reduceat(
+                    self.weights.data, self.weights.indptr[:-1][nonempty]
+                )
+        return float(self._max_weights[term_id])
+
+    def to_state(self) -> Dict:
+        """Plain dict of arrays for persistence"""
+        return {
+            'format': 'csr',
+            'vocabulary': self.vocabulary,
+            'idf': self.idf,
+            'data': self.weights.data,
+            'indices': self.weights.indices,
+            'indptr': self.weights.indptr,
+            'shape': self.weights.shape,
+            'doc_len': self.doc_len,
+            'avgdl': self.avgdl,
+            'k1': self.k1,
+            'b': self.b,
+            'epsilon': self.epsilon
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'SparseBM25':
+        """Restore from ``to_state``, or convert a saved ``BM25Okapi.__dict__``"""
+        if state.get('format') != 'csr':
+            return cls._from_term_frequencies(state['doc_freqs'], state['k1'],
+                                              state['b'], state['epsilon'])
+
+        weights = sparse.csr_matrix((state['data'], state['indices'], state['indptr']),
+                                    shape=state['shape'])
+        return cls(state['vocabulary'], state['idf'], weights, state['doc_len'],
+                   state['avgdl'], state['k1'], state['b'], state['epsilon'])
+
+def _lookup(sorted_docs: np.ndarray, doc_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Which ``doc_ids`` occur in ``sorted_docs`` (mask) and where (positions)"""
+    if len(sorted_docs) == 0:
+        return np.zeros(len(doc_ids), dtype=bool), np.zeros(0, dtype=np.int64)
+    positions = np.searchsorted(sorted_docs, doc_ids)
+    clipped = np.minimum(positions, len(sorted_docs) - 1)
+    hits = (positions < len(sorted_docs)) & (sorted_docs[clipped] == doc_ids)
+    return hits, positions[hits]
+
+def _accumulate(scores: np.ndarray, doc_ids: np.ndarray, docs: np.ndarray,
+                postings: np.ndarray, weight: float):
+    """Add ``weight * postings`` to the scores of the (sorted) ``doc_ids``.
+
+    Binary-searches the shorter list into the longer one, so probing a long
+    posting list for a few candidates only touches O(candidates) entries.
+    """
+    if len(doc_ids) <= len(docs):
+        hits, positions = _lookup(docs, doc_ids)
+        scores[hits] += weight * postings[positions]
+    else:
+        hits, positions = _lookup(doc_ids, docs)
+        scores[positions] += weight * postings[hits]
+
+def _top_k(doc_ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k (doc_ids, scores) with positive scores, best first"""
+    positive = scores > 0
+    doc_ids, scores = doc_ids[positive], scores[positive]
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        doc_ids, scores = doc_ids[best], scores[best]
+    order = np.argsort(-scores, kind='stable')
+    return doc_ids[order], scores[order]
@@ -1,26 +1,116 @@
-from typing import Dict, List, Tuple
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from datetime import datetime
+import json
 import re
-import openai
 from dotenv import load_dotenv
 import os
-from rank_bm25 import BM25Okapi
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import torch
-from collections import Counter
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+import uuid
+from .ann import IVFFlatIndex, cosine_rows, nearest_rows, semantic_similarities
+from .answer_cache import SemanticAnswerCache
+from .batching import EmbeddingBatcher
+from .bm25 import SparseBM25
+from .chunks import ChunkStore, ChunkStoreBuilder
+from .dedup import NearDuplicateIndex
+from .embedding_cache import QueryEmbeddingCache
+from .embedding_service import EmbeddingServiceClient
+from .encoders import create_encoder
+from .fusion import fuse_scores, top_k_indices
+from .index import CompanyIndex, Segment, chunk_hashes, new_segment_id, tokenize
+from .llm import get_async_openai_client, get_openai_client
+from .quantize import QuantizedEmbeddings
+from .store import (save_data, get_data, evict_data, save_segment, get_segment, delete_segment,
+                    get_segment_embeddings, get_segment_quantized, create_scratch_matrix,
+                    company_lock, get_company_revision, delete_legacy_index)
+from .tenant_cache import TenantIndexCache
+from .topics import TopicLabeler
 
 # Load environment variables
 load_dotenv()
 
+# Answers starting with this are LLM failures and are never cached
+SUMMARY_ERROR_PREFIX = "Error processing request: "
+
+# Models often wrap JSON replies in a ```json ... ``` block
+_CODE_FENCE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+
 class EnhancedCompanyBot:
     def __init__(self):
         # Initialize BERT model for embeddings
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model_name = 'all-MiniLM-L6-v2'
+        # With EMBEDDING_SERVICE_SOCKET set, a shared embedding service process
+        # owns the model and this worker never loads torch
+        service_socket = os.getenv('EMBEDDING_SERVICE_SOCKET')
+        if service_socket:
+            self.embedding_model = EmbeddingServiceClient(
+                service_socket, self.embedding_model_name,
+                timeout=float(os.getenv('EMBEDDING_SERVICE_TIMEOUT', '30'))
+            )
+        else:
+            # torch, torch-int8, onnx or onnx-int8; 0 threads keeps the runtime's default
+            self.embedding_model = create_encoder(
+                self.embedding_model_name,
+                backend=os.getenv('EMBEDDING_BACKEND', 'torch'),
+                threads=int(os.getenv('EMBEDDING_THREADS', '0')) or None,
+                interop_threads=int(os.getenv('EMBEDDING_INTEROP_THREADS', '0')) or None
+            )
+
+        # Query embeddings are cached; ingest calls bypass the cache
+        self.query_cache = QueryEmbeddingCache(max_bytes=32 * 1024 * 1024)
+
+        # Cache misses from concurrent requests are encoded together
+        self.query_batcher = EmbeddingBatcher(
+            self._create_embeddings,
+            max_batch_size=int(os.getenv('QUERY_BATCH_SIZE', '32')),
+            max_wait_ms=float(os.getenv('QUERY_BATCH_WAIT_MS', '2'))
+        )
+
+        # Answers to recent questions, reused for close paraphrases until
+        # the company's documents change
+        self.answer_cache = SemanticAnswerCache(
+            threshold=float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.95')),
+            ttl_seconds=float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '3600')),
+            max_entries=int(os.getenv('ANSWER_CACHE_ENTRIES', '256'))
+        )
+
+        # Topics are labelled after the response is sent, several per LLM call
+        self.topic_labeler = TopicLabeler(
+            self._extract_topics, self._fallback_topic,
+            max_batch_size=int(os.getenv('TOPIC_BATCH_SIZE', '8')),
+            max_wait_ms=float(os.getenv('TOPIC_BATCH_WAIT_MS', '1000'))
+        )
+        self.topic_context_chars = 500  # Context excerpt sent per interaction
+
+        # Time from request to first streamed token
+        self.stream_stats = {'streams': 0, 'ttft_seconds': 0.0, 'max_ttft_seconds': 0.0}
+        self.recent_ttft = deque(maxlen=1000)  # For percentiles
+        self.stream_lock = threading.Lock()
+
+        # CPU-bound stages of async chats (index loading, scoring) run here,
+        # so the event loop only ever waits on them
+        self.cpu_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('CHAT_CPU_WORKERS', '0')) or min(8, os.cpu_count() or 1),
+            thread_name_prefix='chat-cpu'
+        )
+
+        # Ingested chunks vs. chunks actually sent to the model (the rest
+        # reuse stored embeddings of identical content)
+        self.ingest_stats = {'chunks': 0, 'embedded': 0, 'seconds': 0.0}
+        self.ingest_batch_size = 256  # Chunks per encoder call during ingest
+        self.ingest_mmap_bytes = 256 * 1024 * 1024  # Larger ingest matrices are staged on disk
         
-        # Storage for company data
-        self.company_data: Dict[str, Dict] = {}
+        # Resident company indexes; least recently queried ones are evicted
+        # to disk once the budget is exceeded and reloaded on demand
+        self.company_data = TenantIndexCache(
+            max_bytes=int(os.getenv('TENANT_CACHE_MB', '2048')) * 1024 * 1024,
+            on_evict=evict_data
+        )
         self.chat_history: Dict[str, List] = {}
         self.current_conversation = {
             'last_query': None,
@@ -32,14 +122,41 @@ class EnhancedCompanyBot:
         # Search parameters
         self.hybrid_weight = 0.7  # Weight for semantic search vs BM25
         self.top_k = 3  # Number of results to retrieve
+        self.fusion_strategy = 'weighted'  # 'weighted', 'rrf' or 'zscore'
+
+        # Approximate nearest-neighbour search for large segments
+        self.ann_min_chunks = 20000  # Smaller segments are scanned exactly
+        # Clusters scanned per query; higher = better recall, slower. None scans
+        # a fixed share of each index's clusters (see app.ann.DEFAULT_PROBE_FRACTION)
+        self.ann_n_probe = None
+
+        # Two-stage retrieval for large segments: cheap candidates, then exact scoring
+        self.two_stage_min_chunks = 50000  # Smaller segments score every chunk exactly
+        self.candidate_sources = ('bm25', 'ann')  # Stage-one generators: 'bm25' and/or 'ann'
+        self.num_candidates = 200  # Candidates taken from each source
+
+        # Compact embeddings for full scans: 'float16', 'int8' or 'none'
+        quantization = os.getenv('EMBEDDING_QUANTIZATION', 'int8')
+        self.quantization = None if quantization == 'none' else quantization
+        self.rescore_candidates = 50  # Best quantized hits re-scored in float32 (0 = off)
+
+        # Near-duplicate chunks in an upload collapse into one (None = off)
+        self.near_duplicate_threshold = 0.8  # Estimated Jaccard similarity of word 3-grams
+
+        # Segment compaction thresholds
+        self.max_segments = 8  # Merge once a company has more segments than this
+        self.max_deleted_ratio = 0.3  # ...or this fraction of chunks is tombstoned
         
         # Error tracking
         self.error_log: List[Dict] = []
 
     def _chunk_text(self, text: str, chunk_size: int = 1000) -> List[str]:
         """Split text into smaller chunks at sentence boundaries"""
+        return list(self._iter_chunks(text, chunk_size))
+
+    def _iter_chunks(self, text: str, chunk_size: int = 1000) -> Iterator[str]:
+        """Yield chunks of a text one at a time (see _chunk_text)"""
         sentences = re.split(r'(?<=[.!?]) +', text)
-        chunks = []
         current_chunk = []
         current_length = 0
         
@@ -49,7 +166,7 @@ class EnhancedCompanyBot:
                 continue
                 
             if current_length + len(sentence) > chunk_size and current_chunk:
-                chunks.append(' '.join(current_chunk))
+                yield ' '.join(current_chunk)
                 current_chunk = []
                 current_length = 0
                 
@@ -57,82 +174,466 @@ class EnhancedCompanyBot:
             current_length += len(sentence)
             
         if current_chunk:
-            chunks.append(' '.join(current_chunk))
-            
-        return chunks
+            yield ' '.join(current_chunk)
 
     def _create_embeddings(self, texts: List[str]) -> np.ndarray:
         """Create embeddings for a list of texts"""
         try:
-            embeddings = self.embedding_model.encode(texts, convert_to_tensor=True)
-            return embeddings.cpu().numpy()
+            return self.embedding_model.encode(texts)
         except Exception as e:
             self._log_error("Embedding creation error", str(e))
             raise
 
-    def add_company_data(self, company_id: str, texts: List[str], sources: List[str]) -> bool:
-        """Process and store company documents"""
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a single search query, served from the LRU cache when possible"""
+        embedding = self.query_cache.get(self.embedding_model_name, query)
+        if embedding is None:
+            embedding = self.query_batcher.embed(query)
+            self.query_cache.put(self.embedding_model_name, query, embedding)
+        return embedding
+
+    async def _embed_query_async(self, query: str) -> np.ndarray:
+        """``_embed_query`` for the event loop: waits on the shared batch without a thread"""
+        embedding = self.query_cache.get(self.embedding_model_name, query)
+        if embedding is None:
+            if not self.query_batcher.enabled:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self.cpu_executor, self._embed_query, query)
+            embedding = await asyncio.wrap_future(self.query_batcher.submit(query))
+            self.query_cache.put(self.embedding_model_name, query, embedding)
+        return embedding
+
+    def add_company_data(self, company_id: str, texts: List[str], sources: List[str],
+                         replace: bool = False) -> bool:
+        """Process company documents into a new index segment.
+
+        Documents whose source was uploaded before replace their older
+        version; everything else is kept unless ``replace`` is set.
+        """
         try:
-            # Process texts into chunks
-            all_chunks = []
-            chunk_sources = []
-            
-            for text, source in zip(texts, sources):
-                chunks = self._chunk_text(text)
-                all_chunks.extend(chunks)
-                chunk_sources.extend([source] * len(chunks))
-            
-            # Create embeddings
-            embeddings = self._create_embeddings(all_chunks)
-            
-            # Create BM25 index
-            tokenized_chunks = [chunk.lower().split() for chunk in all_chunks]
-            bm25 = BM25Okapi(tokenized_chunks)
-            
-            # Store all data
-            self.company_data[company_id] = {
-                'texts': all_chunks,
-                'sources': chunk_sources,
-                'embeddings': embeddings,
-                'bm25': bm25,
-                'last_updated': datetime.now()
-            }
-            
-            return True
+            # The resident index supplies embeddings of content seen before
+            company = self._get_company(company_id)
+            if company is None:
+                company = CompanyIndex(ann_min_chunks=self.ann_min_chunks,
+                                       quantization=self.quantization)
+
+            # Chunks stream into the arena; the encoder sees fixed-size batches
+            start = time.perf_counter()
+            chunks, duplicate_sources = self._collect_chunks(texts, sources)
+
+            segment = None
+            if len(chunks):
+                # Only chunks whose content was never embedded go to the model
+                hashes = chunk_hashes(chunks.iter_texts(), self.embedding_model_name)
+                embeddings = self._embed_chunks(company_id, company, chunks, hashes)
+                # Chunk ids are assigned under the manifest lock below
+                segment = Segment.build(new_segment_id(), np.zeros(len(chunks), dtype=np.int64),
+                                        chunks, embeddings,
+                                        company.ann_min_chunks, company.quantization, hashes,
+                                        duplicate_sources)
+            self._record_ingest(company_id, len(chunks), time.perf_counter() - start)
+
+            with company_lock(company_id):
+                # Extend the index as last persisted by any worker, not a stale copy
+                company = self._current_company(company_id)
+                if company is None:
+                    company = CompanyIndex(ann_min_chunks=self.ann_min_chunks,
+                                           quantization=self.quantization)
+
+                if segment is not None:
+                    segment.chunk_ids = company.allocate_chunk_ids(len(segment))
+                    # Only a persisted segment may join the index; the manifest
+                    # must never name one without files
+                    if not self._save_segment(company_id, segment):
+                        return False
+                    # Old chunks go only now, so a failed upload leaves them searchable
+                    company.add_segment(segment, replace=replace)
+                    self._map_persisted_arrays(company_id, segment)
+                elif replace:
+                    company.delete_all()
+
+                # Persist so the company survives restarts without re-uploading
+                success = self._save_company_manifest(company_id, company)
+                self.company_data.put(company_id, company)  # re-account its grown size
+            self._schedule_merge(company_id, company)
+            return success
         except Exception as e:
             self._log_error("Company data addition error", str(e))
             return False
 
-    def _hybrid_search(self, query: str, company_id: str) -> List[Tuple[int, float]]:
-        """Perform hybrid search combining semantic and BM25"""
+    def _collect_chunks(self, texts: List[str], sources: List[str]
+                        ) -> Tuple[ChunkStore, Dict[int, List[str]]]:
+        """Chunk documents into an arena, keeping one chunk per near-duplicate group.
+
+        Returns the kept chunks and, for representatives of copies from
+        other documents, the list of those other sources.
+        """
+        builder = ChunkStoreBuilder()
+        duplicate_sources: Dict[int, List[str]] = {}
+        dedup = (NearDuplicateIndex(self.near_duplicate_threshold)
+                 if self.near_duplicate_threshold is not None else None)
+        kept: Dict[int, Tuple[int, str]] = {}  # dedup index -> (row, source)
+
+        chunk_stream = ((chunk, source) for text, source in zip(texts, sources)
+                        for chunk in self._iter_chunks(text))
+        for i, (chunk, source) in enumerate(chunk_stream):
+            if dedup is None:
+                builder.append(chunk, source)
+                continue
+
+            representative = dedup.add(chunk)
+            if representative == i:
+                kept[i] = (builder.append(chunk, source), source)
+                continue
+
+            row, representative_source = kept[representative]
+            if source != representative_source:
+                others = duplicate_sources.setdefault(row, [])
+                if source not in others:
+                    others.append(source)
+        return builder.build(), duplicate_sources
+
+    def _embed_chunks(self, company_id: str, company: CompanyIndex, chunks: ChunkStore,
+                      hashes: np.ndarray) -> np.ndarray:
+        """Embed chunks in fixed-size batches into a preallocated matrix.
+
+        Content seen before is copied from its stored embedding instead, and
+        repeated content within the upload is embedded once.
+        """
+        embeddings = self._allocate_embeddings(len(chunks))
+        known = company.find_chunks(hashes)
+        first_row: Dict[bytes, int] = {}
+        copies: List[Tuple[int, int]] = []
+        batch: List[int] = []
+        embedded = 0
+        start = last_report = time.perf_counter()
+
+        for row, key in enumerate(hashes.tolist()):
+            if key in known:
+                segment, position = known[key]
+                embeddings[row] = segment.embeddings[position]
+            elif key in first_row:
+                copies.append((row, first_row[key]))
+            else:
+                first_row[key] = row
+                batch.append(row)
+
+            if len(batch) == self.ingest_batch_size or (batch and row == len(chunks) - 1):
+                embeddings[batch] = self._create_embeddings([chunks.text(i) for i in batch])
+                embedded += len(batch)
+                batch = []
+                if time.perf_counter() - last_report > 5:
+                    last_report = time.perf_counter()
+                    print(f"Embedding {company_id}: {row + 1}/{len(chunks)} chunks "
+                          f"({(row + 1) / (last_report - start):.0f} chunks/sec)")
+
+        for row, source_row in copies:
+            embeddings[row] = embeddings[source_row]
+
+        self.ingest_stats['embedded'] += embedded
+        return embeddings
+
+    def _allocate_embeddings(self, rows: int) -> np.ndarray:
+        """Output matrix for ingest, staged on disk once it exceeds ingest_mmap_bytes"""
+        dim = self.embedding_model.get_sentence_embedding_dimension()
+        if rows * dim * 4 > self.ingest_mmap_bytes:
+            return create_scratch_matrix(rows, dim)
+        return np.empty((rows, dim), dtype=np.float32)
+
+    def _record_ingest(self, company_id: str, chunks: int, seconds: float):
+        """Update ingest counters and report throughput"""
+        self.ingest_stats['chunks'] += chunks
+        self.ingest_stats['seconds'] += seconds
+        if chunks:
+            print(f"Ingested {chunks} chunks for {company_id} in {seconds:.1f}s "
+                  f"({chunks / max(seconds, 1e-9):.0f} chunks/sec)")
+
+    def delete_company_documents(self, company_id: str, sources: List[str]) -> int:
+        """Tombstone all chunks of the given documents; returns chunks removed"""
         try:
-            company = self.company_data[company_id]
-            
-            # Semantic search
-            query_embedding = self._create_embeddings([query])[0]
-            semantic_similarities = cosine_similarity(
-                query_embedding.reshape(1, -1), 
-                company['embeddings']
-            )[0]
-            
-            # BM25 search
-            tokenized_query = query.lower().split()
-            bm25_scores = company['bm25'].get_scores(tokenized_query)
-            
-            # Normalize scores
-            semantic_scores = (semantic_similarities + 1) / 2  # Convert to 0-1 range
-            if max(bm25_scores) > 0:
-                bm25_scores = bm25_scores / max(bm25_scores)
+            with company_lock(company_id):
+                company = self._current_company(company_id)
+                if company is None:
+                    return 0
+                deleted = company.delete_sources(sources)
+                if deleted:
+                    self._save_company_manifest(company_id, company)
+            if deleted:
+                self._schedule_merge(company_id, company)
+            return deleted
+        except Exception as e:
+            self._log_error("Company data deletion error", str(e))
+            return 0
+
+    def _save_segment(self, company_id: str, segment: Segment) -> bool:
+        """Persist one segment's chunks, embeddings and BM25 statistics"""
+        return save_segment(company_id, segment.segment_id, {
+            'chunk_ids': segment.chunk_ids.tolist(),
+            'chunks': segment.chunks.to_state(),
+            'duplicate_sources': {str(row): others for row, others in segment.duplicate_sources.items()},
+            'hashes': segment.hashes,
+            'embeddings': segment.embeddings,
+            'lexical': segment.bm25.to_state(),
+            'ann': segment.ann.to_state() if segment.ann is not None else None,
+            'quantized': segment.quantized.to_state() if segment.quantized is not None else None
+        })
+
+    def _map_persisted_arrays(self, company_id: str, segment: Segment):
+        """Serve a saved segment's embeddings from its files so the built matrices can be released"""
+        embeddings = get_segment_embeddings(company_id, segment.segment_id)
+        if embeddings is not None:
+            segment.embeddings = embeddings
+        quantized = get_segment_quantized(company_id, segment.segment_id)
+        if quantized is not None:
+            segment.quantized = QuantizedEmbeddings.from_state(quantized)
+
+    def _save_company_manifest(self, company_id: str, company: CompanyIndex) -> bool:
+        """Persist the list of segments and their tombstones.
+
+        Callers other than the first load hold ``company_lock``, so no other
+        worker rewrites the manifest in between.
+        """
+        revision = uuid.uuid4().hex
+        with company.lock:
+            saved = save_data(company_id, {
+                'documents': company.live_sources(),
+                'config': {'embedding_model': self.embedding_model_name},
+                'segments': [
+                    {
+                        'segment_id': segment.segment_id,
+                        'created_at': segment.created_at.isoformat(),
+                        'deleted': np.flatnonzero(segment.deleted).tolist(),
+                        'removed_sources': sorted(segment.removed_sources)
+                    }
+                    for segment in company.segments
+                ],
+                'next_chunk_id': company.next_chunk_id,
+                # Content version, so a reload is not mistaken for a change
+                'last_updated': company.last_updated.isoformat(),
+                'revision': revision
+            })
+            if saved:
+                company.revision = revision
+            return saved
+
+    def _load_company_index(self, company_id: str) -> Optional[CompanyIndex]:
+        """Rebuild a company's in-memory indexes from the DataStore"""
+        data = get_data(company_id)
+        if not data:
+            return None
+
+        # Embeddings from a different model are not comparable with our queries
+        if data.get('config', {}).get('embedding_model') != self.embedding_model_name:
+            self._log_error("Company data load error",
+                            f"Stored index for {company_id} uses a different embedding model")
+            return None
+
+        try:
+            if 'segments' in data:
+                segments = [self._load_segment(company_id, entry) for entry in data['segments']]
+                if any(segment is None for segment in segments):
+                    raise ValueError(f"Missing segment files for {company_id}")
+                next_chunk_id = data.get('next_chunk_id', 0)
+            elif 'embeddings' in data and 'lexical' in data:
+                # Single-file index written before segments existed
+                segments = [self._migrate_legacy_index(data)]
+                next_chunk_id = len(segments[0])
+            else:
+                return None
+
+            company = CompanyIndex(
+                segments, next_chunk_id,
+                datetime.fromisoformat(data.get('last_updated') or data['updated_at']),
+                self.ann_min_chunks, self.quantization
+            )
+            company.revision = data.get('revision')
+
+            if 'segments' not in data and self._save_segment(company_id, segments[0]):
+                self._map_persisted_arrays(company_id, segments[0])
+                # Once the manifest names the segment the old files are never read again
+                if self._save_company_manifest(company_id, company):
+                    delete_legacy_index(company_id)
+            return company
+        except Exception as e:
+            self._log_error("Company data load error", str(e))
+            return None
+
+    def _load_segment(self, company_id: str, entry: Dict) -> Optional[Segment]:
+        """Restore one segment without re-embedding or re-tokenizing"""
+        data = get_segment(company_id, entry['segment_id'])
+        if data is None:
+            return None
+
+        bm25 = SparseBM25.from_state(data['lexical'])
+
+        ann = IVFFlatIndex.from_state(data['ann']) if 'ann' in data else None
+        quantized = (QuantizedEmbeddings.from_state(data['quantized'])
+                     if 'quantized' in data else None)
+
+        if 'chunks' in data:
+            chunks = ChunkStore.from_state(data['chunks'])
+        else:
+            chunks = ChunkStore.build(data['texts'], data['sources'])
+
+        # Segments written before content hashing get their hashes computed once
+        hashes = data.get('hashes')
+        if hashes is None:
+            hashes = chunk_hashes(chunks.iter_texts(), self.embedding_model_name)
+
+        deleted = np.zeros(len(chunks), dtype=bool)
+        deleted[entry.get('deleted', [])] = True
+        duplicate_sources = {int(row): others
+                             for row, others in data.get('duplicate_sources', {}).items()}
+        segment = Segment(entry['segment_id'], np.array(data['chunk_ids'], dtype=np.int64),
+                          chunks, data['embeddings'], bm25,
+                          deleted, datetime.fromisoformat(entry['created_at']), ann, quantized,
+                          hashes, duplicate_sources, entry.get('removed_sources', []))
+
+        if 'chunks' not in data:
+            # Rewrite in the current layout so the chunk arena is memory-mapped next time
+            self._save_segment(company_id, segment)
+        return segment
+
+    def _migrate_legacy_index(self, data: Dict) -> Segment:
+        """Turn a pre-segment company index into a single segment"""
+        bm25 = SparseBM25.from_state(data['lexical'])
+
+        documents = data.get('documents', [])
+        texts = [doc['text'] for doc in documents]
+        return Segment(new_segment_id(), np.arange(len(documents), dtype=np.int64),
+                       ChunkStore.build(texts, [doc['source'] for doc in documents]),
+                       data['embeddings'], bm25,
+                       hashes=chunk_hashes(texts, self.embedding_model_name))
+
+    def _get_company(self, company_id: str) -> Optional[CompanyIndex]:
+        """Return a company's index, loading it from the DataStore if not resident"""
+        return self.company_data.get_or_load(company_id, self._load_company_index)
+
+    def _current_company(self, company_id: str) -> Optional[CompanyIndex]:
+        """The company's index as last persisted by any worker (hold ``company_lock``).
+
+        Workers sharing the data directory each keep their own resident
+        copy; one that another worker's write made stale is reloaded.
+        """
+        company = self._get_company(company_id)
+        revision = get_company_revision(company_id)
+        if company is not None and company.revision == revision:
+            return company
+
+        evict_data(company_id)
+        company = self._load_company_index(company_id)
+        if company is None:
+            self.company_data.pop(company_id)
+        else:
+            self.company_data.put(company_id, company)
+        return company
+
+    def _schedule_merge(self, company_id: str, company: CompanyIndex):
+        """Compact a company's segments in the background when needed"""
+        if company.needs_merge(self.max_segments, self.max_deleted_ratio):
+            threading.Thread(target=self._merge_company, args=(company_id, company),
+                             daemon=True).start()
+
+    def _merge_company(self, company_id: str, company: CompanyIndex):
+        """Merge segments and swap the persisted files"""
+        try:
+            with ExitStack() as locked:
+                def persist(merged: Optional[Segment]) -> bool:
+                    # The merged segment is saved before it replaces the old ones;
+                    # if that fails the old segments and their files stay as they are
+                    if merged is not None and not self._save_segment(company_id, merged):
+                        return False
+                    # Held until the new manifest is written; if another worker
+                    # rewrote it meanwhile, its segments are not ours to drop
+                    locked.enter_context(company_lock(company_id))
+                    if get_company_revision(company_id) != company.revision:
+                        if merged is not None:
+                            delete_segment(company_id, merged.segment_id)
+                        return False
+                    return True
+
+                result = company.merge(persist=persist)
+                if result is None:
+                    return
+
+                merged, removed = result
+                if merged is not None:
+                    self._map_persisted_arrays(company_id, merged)
+                saved = self._save_company_manifest(company_id, company)
+                self.company_data.put(company_id, company)
+                if not saved:
+                    return  # The old manifest still names the old segments, so keep their files
+                for segment in removed:
+                    delete_segment(company_id, segment.segment_id)
+        except Exception as e:
+            self._log_error("Segment merge error", str(e))
+
+    def _score_segment(self, segment: Segment, query_embedding: np.ndarray,
+                       tokenized_query: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Semantic and BM25 scores for the rows of a segment worth fusing.
+
+        Small segments score every live chunk. Large ones use two stages:
+        BM25 top-k and/or ANN neighbours propose candidates, then exact cosine
+        and BM25 are computed for those candidates only. Full scans run over
+        the quantized embeddings when the segment has them, and the best
+        ``rescore_candidates`` rows get their exact cosine back.
+        """
+        deleted = segment.deleted.copy()
+        if len(segment) < self.two_stage_min_chunks:
+            rows = np.flatnonzero(~deleted)
+            similarities = semantic_similarities(segment.embeddings, query_embedding,
+                                                 segment.ann, self.ann_n_probe,
+                                                 segment.quantized)[rows]
+            if segment.ann is None and segment.quantized is not None and self.rescore_candidates:
+                best = top_k_indices(similarities, self.rescore_candidates)
+                similarities[best] = cosine_rows(segment.embeddings, query_embedding, rows[best])
+            return rows, similarities, segment.bm25.get_scores(tokenized_query)[rows]
+
+        # Stage one: candidate generation
+        k = min(self.num_candidates, len(segment))
+        candidates = [np.zeros(0, dtype=np.int64)]
+        if 'bm25' in self.candidate_sources:
+            lexical_rows, _ = segment.bm25.top_k(tokenized_query, k, deleted)
+            candidates.append(lexical_rows)
+        if 'ann' in self.candidate_sources:
+            candidates.append(nearest_rows(segment.embeddings, query_embedding, k,
+                                           segment.ann, self.ann_n_probe, deleted,
+                                           segment.quantized))
+        rows = np.unique(np.concatenate(candidates))
+
+        # Stage two: exact scoring of the candidates
+        return (rows, cosine_rows(segment.embeddings, query_embedding, rows),
+                segment.bm25.get_batch_scores(tokenized_query, rows))
+
+    def _hybrid_search(self, query: str, company: CompanyIndex,
+                       query_embedding: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Perform hybrid search combining semantic and BM25.
+
+        Fans out over all live segments and returns (chunk_id, score) pairs.
+        The query is embedded here unless its embedding is passed in.
+        """
+        try:
+            segments = company.live_segments()
+            if not segments:
+                return []
             
-            # Combine scores
-            combined_scores = []
-            for i in range(len(company['texts'])):
-                combined_score = (self.hybrid_weight * semantic_scores[i] + 
-                                (1 - self.hybrid_weight) * bm25_scores[i])
-                combined_scores.append((i, combined_score))
+            if query_embedding is None:
+                query_embedding = self._embed_query(query)
+            tokenized_query = tokenize(query)
+            scored = [self._score_segment(segment, query_embedding, tokenized_query)
+                      for segment in segments]
+
+            chunk_ids = np.concatenate([segment.chunk_ids[rows]
+                                        for segment, (rows, _, _) in zip(segments, scored)])
+            similarities = np.concatenate([sims for _, sims, _ in scored])
+            bm25_scores = np.concatenate([bm25 for _, _, bm25 in scored])
             
-            # Sort by combined score
-            return sorted(combined_scores, key=lambda x: x[1], reverse=True)[:self.top_k]
+            # Fuse and keep the best top_k without materializing per-chunk tuples
+            # (with BM25 candidates the set always holds the BM25 maximum)
+            combined_scores = fuse_scores(similarities, bm25_scores,
+                                          self.hybrid_weight, self.fusion_strategy)
+            best = top_k_indices(combined_scores, self.top_k)
+            return [(int(chunk_ids[i]), float(combined_scores[i])) for i in best]
             
         except Exception as e:
             self._log_error("Hybrid search error", str(e))
@@ -140,7 +641,8 @@ class EnhancedCompanyBot:
 
     def get_response(self, company_id: str, message: str) -> Tuple[str, float, str, str]:
         """Get chatbot response using hybrid search"""
-        if company_id not in self.company_data:
+        company = self._get_company(company_id)
+        if company is None:
             return "Company not found.", 0.0, "", ""
 
         try:
@@ -150,25 +652,30 @@ class EnhancedCompanyBot:
             else:
                 enhanced_message = message
             
-            # Perform hybrid search
-            search_results = self._hybrid_search(enhanced_message, company_id)
-            
-            if not search_results or search_results[0][1] < 0.1:
-                return "I couldn't find relevant information to answer your question.", 0.0, "", ""
-            
-            # Get relevant chunks and source
-            relevant_indices = [idx for idx, score in search_results if score > 0.1]
-            relevant_chunks = [self.company_data[company_id]['texts'][i] for i in relevant_indices]
-            context = " ".join(relevant_chunks)
-            source = f"Source: {self.company_data[company_id]['sources'][relevant_indices[0]]}"
-            
-            # Generate response using OpenAI
-            response = self._get_openai_summary(context, enhanced_message)
-            confidence = float(search_results[0][1])
+            # Paraphrases of a recently answered question reuse its answer
+            query_embedding = self._embed_query(enhanced_message)
+            version = company.version
+            cached = self.answer_cache.get(company_id, version, query_embedding)
+            if cached is not None:
+                response, confidence, context, source = cached
+            else:
+                # Perform hybrid search
+                retrieved = self._retrieve_context(enhanced_message, company, query_embedding)
+                if retrieved is None:
+                    return "I couldn't find relevant information to answer your question.", 0.0, "", ""
+                context, source, confidence = retrieved
+                
+                # Generate response using OpenAI
+                start = time.perf_counter()
+                response = self._get_openai_summary(context, enhanced_message)
+                self._cache_answer(company_id, version, query_embedding,
+                                   (response, confidence, context, source),
+                                   time.perf_counter() - start)
             
             # Update conversation context
             self._update_conversation_context(enhanced_message, context, response)
-            self._add_to_history(company_id, message, response, confidence)
+            record = self._add_to_history(company_id, message, response, confidence)
+            self._label_topic(enhanced_message, context, record)
             
             return response, confidence, context, source
             
@@ -176,12 +683,184 @@ class EnhancedCompanyBot:
             self._log_error("Response generation error", str(e))
             return "I encountered an error processing your request.", 0.0, "", ""
 
-    def _get_openai_summary(self, context: str, question: str) -> str:
-        """Get a precise answer from OpenAI"""
+    async def get_response_async(self, company_id: str, message: str) -> Tuple[str, float, str, str]:
+        """``get_response`` without blocking the event loop.
+
+        LLM calls are awaited on the async client, the query embedding joins
+        the shared batch, and index loading and scoring run on
+        ``cpu_executor``. Cancelling the task (e.g. when the client
+        disconnects) abandons the chat at its next await; a scoring step
+        already running in the executor finishes but its result is dropped.
+        """
+        loop = asyncio.get_running_loop()
+        company = await loop.run_in_executor(self.cpu_executor, self._get_company, company_id)
+        if company is None:
+            return "Company not found.", 0.0, "", ""
+
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-            
-            prompt = f"""Answer STRICTLY using the context. Follow these rules:
+            enhanced_message, query_embedding = await self._prepare_query_async(message)
+            version = company.version
+            cached = self.answer_cache.get(company_id, version, query_embedding)
+            if cached is not None:
+                response, confidence, context, source = cached
+            else:
+                retrieved = await loop.run_in_executor(
+                    self.cpu_executor, self._retrieve_context, enhanced_message, company,
+                    query_embedding)
+                if retrieved is None:
+                    return ("I couldn't find relevant information to answer your question.",
+                            0.0, "", "")
+                context, source, confidence = retrieved
+
+                start = time.perf_counter()
+                response = await self._get_openai_summary_async(context, enhanced_message)
+                self._cache_answer(company_id, version, query_embedding,
+                                   (response, confidence, context, source),
+                                   time.perf_counter() - start)
+
+            self._update_conversation_context(enhanced_message, context, response)
+            record = self._add_to_history(company_id, message, response, confidence)
+            self._label_topic(enhanced_message, context, record)
+
+            return response, confidence, context, source
+
+        except Exception as e:
+            self._log_error("Response generation error", str(e))
+            return "I encountered an error processing your request.", 0.0, "", ""
+
+    async def stream_response_async(self, company_id: str, message: str) -> AsyncIterator[Dict]:
+        """Stream a chat as events: ``metadata`` first, then ``token``s, then ``done``.
+
+        ``metadata`` carries source, confidence and context as soon as
+        retrieval finishes; each ``token`` carries the next piece of the
+        answer as the LLM produces it. Failures after metadata was sent end
+        the stream with an ``error`` event.
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        company = await loop.run_in_executor(self.cpu_executor, self._get_company, company_id)
+        if company is None:
+            for event in self._canned_stream("Company not found."):
+                yield event
+            return
+
+        try:
+            enhanced_message, query_embedding = await self._prepare_query_async(message)
+            version = company.version
+            cached = self.answer_cache.get(company_id, version, query_embedding)
+            retrieved = None
+            if cached is None:
+                retrieved = await loop.run_in_executor(
+                    self.cpu_executor, self._retrieve_context, enhanced_message, company,
+                    query_embedding)
+        except Exception as e:
+            self._log_error("Response generation error", str(e))
+            for event in self._canned_stream("I encountered an error processing your request."):
+                yield event
+            return
+
+        if cached is not None:
+            response, confidence, context, source = cached
+        elif retrieved is not None:
+            context, source, confidence = retrieved
+        else:
+            for event in self._canned_stream(
+                    "I couldn't find relevant information to answer your question."):
+                yield event
+            return
+        yield {'event': 'metadata',
+               'data': {'source': source, 'confidence': confidence, 'context': context}}
+
+        if cached is not None:
+            # A cached answer arrives as a single token
+            yield {'event': 'token', 'data': {'text': response}}
+        else:
+            pieces = []
+            llm_start = time.perf_counter()
+            try:
+                client = get_async_openai_client()
+                stream = await client.chat.completions.create(
+                    **self._summary_request(context, enhanced_message), stream=True)
+                try:
+                    async for chunk in stream:
+                        text = chunk.choices[0].delta.content if chunk.choices else None
+                        if not text:
+                            continue
+                        if not pieces:
+                            self._record_first_token(time.perf_counter() - start)
+                        pieces.append(text)
+                        yield {'event': 'token', 'data': {'text': text}}
+                finally:
+                    await stream.response.aclose()  # Stops generation if the client went away
+            except Exception as e:
+                self._log_error("OpenAI summary error", str(e))
+                yield {'event': 'error', 'data': {'message': f"{SUMMARY_ERROR_PREFIX}{str(e)}"}}
+                return
+
+            response = "".join(pieces).strip()
+            self._cache_answer(company_id, version, query_embedding,
+                               (response, confidence, context, source),
+                               time.perf_counter() - llm_start)
+
+        self._update_conversation_context(enhanced_message, context, response)
+        record = self._add_to_history(company_id, message, response, confidence)
+        self._label_topic(enhanced_message, context, record)
+        yield {'event': 'done',
+               'data': {'response': response, 'confidence': confidence, 'source': source}}
+
+    def _canned_stream(self, response: str) -> List[Dict]:
+        """Events of a stream whose whole answer is a fixed message"""
+        return [
+            {'event': 'metadata', 'data': {'source': "", 'confidence': 0.0, 'context': ""}},
+            {'event': 'token', 'data': {'text': response}},
+            {'event': 'done', 'data': {'response': response, 'confidence': 0.0, 'source': ""}}
+        ]
+
+    def _record_first_token(self, seconds: float):
+        with self.stream_lock:
+            self.stream_stats['streams'] += 1
+            self.stream_stats['ttft_seconds'] += seconds
+            self.stream_stats['max_ttft_seconds'] = max(self.stream_stats['max_ttft_seconds'],
+                                                        seconds)
+            self.recent_ttft.append(seconds)
+
+    async def _prepare_query_async(self, message: str) -> Tuple[str, np.ndarray]:
+        """Rewrite a follow-up into a standalone question and embed it"""
+        if self._is_follow_up_question(message):
+            enhanced_message = await self._enhance_with_context_async(message)
+        else:
+            enhanced_message = message
+        return enhanced_message, await self._embed_query_async(enhanced_message)
+
+    def _cache_answer(self, company_id: str, version: str, query_embedding: np.ndarray,
+                      answer: Tuple[str, float, str, str], llm_seconds: float):
+        """Remember a generated answer unless the LLM call failed"""
+        if not answer[0] or answer[0].startswith(SUMMARY_ERROR_PREFIX):
+            return
+        self.answer_cache.put(company_id, version, query_embedding, answer, llm_seconds)
+
+    def _retrieve_context(self, query: str, company: CompanyIndex,
+                          query_embedding: Optional[np.ndarray] = None
+                          ) -> Optional[Tuple[str, str, float]]:
+        """Search and assemble (context, source, confidence), or None if nothing is relevant"""
+        search_results = self._hybrid_search(query, company, query_embedding)
+        
+        if not search_results or search_results[0][1] < 0.1:
+            return None
+        
+        # Get relevant chunks and source (chunks deleted since the search are skipped)
+        relevant_chunks = [company.get_chunk(chunk_id) for chunk_id, score in search_results
+                           if score > 0.1]
+        relevant_chunks = [chunk for chunk in relevant_chunks if chunk is not None]
+        if not relevant_chunks:
+            return None
+        context = " ".join(text for text, _ in relevant_chunks)
+        source = f"Source: {relevant_chunks[0][1]}"
+        return context, source, float(search_results[0][1])
+
+    def _summary_request(self, context: str, question: str) -> Dict:
+        """Chat completion arguments for answering from the retrieved context"""
+        prompt = f"""Answer STRICTLY using the context. Follow these rules:
             1. Cite EXACT numbers/dates/percentages when available
             2. For policies: List ALL conditions and steps
             3. Use bullet points for multi-part answers
@@ -192,20 +871,35 @@ class EnhancedCompanyBot:
             Question: {question}
             Answer:"""
 
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a precision-focused technical assistant"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=250,
-                temperature=0.1
-            )
-            
+        return {
+            'model': "gpt-3.5-turbo",
+            'messages': [
+                {"role": "system", "content": "You are a precision-focused technical assistant"},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': 250,
+            'temperature': 0.1
+        }
+
+    def _get_openai_summary(self, context: str, question: str) -> str:
+        """Get a precise answer from OpenAI"""
+        try:
+            client = get_openai_client()
+            response = client.chat.completions.create(**self._summary_request(context, question))
             return response.choices[0].message.content.strip()
         except Exception as e:
             self._log_error("OpenAI summary error", str(e))
-            return f"Error processing request: {str(e)}"
+            return f"{SUMMARY_ERROR_PREFIX}{str(e)}"
+
+    async def _get_openai_summary_async(self, context: str, question: str) -> str:
+        try:
+            client = get_async_openai_client()
+            response = await client.chat.completions.create(
+                **self._summary_request(context, question))
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            self._log_error("OpenAI summary error", str(e))
+            return f"{SUMMARY_ERROR_PREFIX}{str(e)}"
 
     def _is_follow_up_question(self, message: str) -> bool:
         """Detect if a question is a follow-up to the previous one"""
@@ -219,77 +913,123 @@ class EnhancedCompanyBot:
             self.current_conversation['last_query'] is not None
         )
 
+    def _follow_up_request(self, message: str) -> Dict:
+        """Chat completion arguments for rewriting a follow-up as a standalone question"""
+        prompt = f"""Previous Topic: {self.current_conversation['current_topic']}
+            Last Query: {self.current_conversation['last_query']}
+            Follow-up: {message}
+            
+            Create a standalone question that explicitly includes needed context."""
+        
+        return {
+            'model': "gpt-3.5-turbo",
+            'messages': [
+                {"role": "system", "content": "Convert follow-ups to context-aware queries"},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': 150,
+            'temperature': 0.2
+        }
+
     def _enhance_with_context(self, message: str) -> str:
         """Enhance a follow-up question with context"""
         if not self.current_conversation['current_topic']:
             return message
             
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-            prompt = f"""Previous Topic: {self.current_conversation['current_topic']}
-            Last Query: {self.current_conversation['last_query']}
-            Follow-up: {message}
-            
-            Create a standalone question that explicitly includes needed context."""
-            
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Convert follow-ups to context-aware queries"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=150,
-                temperature=0.2
-            )
+            client = get_openai_client()
+            response = client.chat.completions.create(**self._follow_up_request(message))
             return response.choices[0].message.content.strip()
         except Exception as e:
             self._log_error("Context enhancement error", str(e))
             return message
 
-    def _extract_topic(self, query: str, context: str) -> str:
-        """Extract the main topic from query and context"""
+    async def _enhance_with_context_async(self, message: str) -> str:
+        if not self.current_conversation['current_topic']:
+            return message
+
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-            prompt = f"""Identify the core technical/business topic from this interaction:
-            Query: {query}
-            Context: {context}
-            Return a 3-5 word topic descriptor."""
-            
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Extract technical conversation topics"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=25,
-                temperature=0.2
-            )
+            client = get_async_openai_client()
+            response = await client.chat.completions.create(**self._follow_up_request(message))
             return response.choices[0].message.content.strip()
+        except Exception as e:
+            self._log_error("Context enhancement error", str(e))
+            return message
+
+    def _topics_request(self, interactions: List[Tuple[str, str]]) -> Dict:
+        """Chat completion arguments for labelling several interactions' topics"""
+        listing = "\n".join(f"{i + 1}. Query: {query} | Context: {context[:self.topic_context_chars]}"
+                             for i, (query, context) in enumerate(interactions))
+        prompt = f"""Identify the core technical/business topic of each interaction:
+            {listing}
+            Return only a JSON array with one 3-5 word topic descriptor per interaction, in order."""
+        
+        return {
+            'model': "gpt-3.5-turbo",
+            'messages': [
+                {"role": "system", "content": "Extract technical conversation topics"},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': 25 * len(interactions),
+            'temperature': 0.2
+        }
+
+    def _extract_topics(self, interactions: List[Tuple[str, str]]) -> List[str]:
+        """Label the main topic of several (query, context) interactions in one call"""
+        try:
+            client = get_openai_client()
+            response = client.chat.completions.create(**self._topics_request(interactions))
+            topics = json.loads(_CODE_FENCE.sub('', response.choices[0].message.content))
+            if not isinstance(topics, list) or len(topics) != len(interactions):
+                raise ValueError(f"Expected {len(interactions)} topics, got {topics!r}")
+            return [str(topic).strip() for topic in topics]
         except Exception as e:
             self._log_error("Topic extraction error", str(e))
-            return query.split()[0] if query else "general"
+            raise
+
+    def _fallback_topic(self, query: str) -> str:
+        words = query.split()
+        return words[0] if words else "general"
 
     def _update_conversation_context(self, query: str, context: str, response: str):
-        """Update conversation tracking"""
+        """Update conversation tracking; the topic is filled in by ``_label_topic``"""
         self.current_conversation = {
             'last_query': query,
             'last_context': context,
             'last_response': response,
-            'current_topic': self._extract_topic(query, context)
+            # The previous topic stands in until this interaction is labelled
+            'current_topic': self.current_conversation['current_topic']
         }
 
-    def _add_to_history(self, company_id: str, message: str, response: str, confidence: float):
-        """Record interaction history"""
+    def _add_to_history(self, company_id: str, message: str, response: str,
+                        confidence: float) -> Dict:
+        """Record interaction history (topic pending) and return the record"""
         if company_id not in self.chat_history:
             self.chat_history[company_id] = []
             
-        self.chat_history[company_id].append({
+        record = {
             'timestamp': datetime.now().isoformat(),
             'message': message,
             'response': response,
             'confidence': confidence,
-            'topic': self.current_conversation['current_topic']
-        })
+            'topic': None
+        }
+        self.chat_history[company_id].append(record)
+        return record
+
+    def _label_topic(self, query: str, context: str, record: Dict):
+        """Label the interaction in the background and write the topic back.
+
+        Keeps the LLM labelling call off the response path; the topic lands
+        on the history record and, if no newer query has arrived, becomes
+        the conversation's current topic for follow-up rewriting.
+        """
+        def on_topic(topic: str):
+            record['topic'] = topic
+            if self.current_conversation['last_query'] == query:
+                self.current_conversation['current_topic'] = topic
+
+        self.topic_labeler.submit(query, context, on_topic)
 
     def _log_error(self, error_type: str, error_message: str):
         """Log errors for monitoring"""
@@ -310,6 +1050,51 @@ class EnhancedCompanyBot:
             "error_types": dict(error_types.most_common())
         }
 
+    def get_embedding_cache_stats(self) -> Dict:
+        """Get query embedding cache statistics for monitoring"""
+        return self.query_cache.stats()
+
+    def get_ingest_stats(self) -> Dict:
+        """Get ingest throughput and how many chunks reused stored embeddings"""
+        chunks, embedded = self.ingest_stats['chunks'], self.ingest_stats['embedded']
+        seconds = self.ingest_stats['seconds']
+        return {
+            "chunks": chunks,
+            "embedded": embedded,
+            "reused": chunks - embedded,
+            "reuse_rate": (chunks - embedded) / chunks if chunks else 0.0,
+            "chunks_per_sec": chunks / seconds if seconds else 0.0
+        }
+
+    def get_query_batch_stats(self) -> Dict:
+        """Get query embedding micro-batching statistics for monitoring"""
+        return self.query_batcher.stats()
+
+    def get_stream_stats(self) -> Dict:
+        """Get time-to-first-token statistics of streamed chats"""
+        with self.stream_lock:
+            streams = self.stream_stats['streams']
+            recent = np.array(self.recent_ttft) * 1000
+            return {
+                "streams": streams,
+                "avg_ttft_ms": self.stream_stats['ttft_seconds'] * 1000 / streams if streams else 0.0,
+                "p50_ttft_ms": float(np.percentile(recent, 50)) if len(recent) else 0.0,
+                "p95_ttft_ms": float(np.percentile(recent, 95)) if len(recent) else 0.0,
+                "max_ttft_ms": self.stream_stats['max_ttft_seconds'] * 1000
+            }
+
+    def get_answer_cache_stats(self) -> Dict:
+        """Get semantic answer cache hit rate and saved LLM time for monitoring"""
+        return self.answer_cache.stats()
+
+    def get_topic_stats(self) -> Dict:
+        """Get background topic labelling statistics for monitoring"""
+        return self.topic_labeler.stats()
+
+    def get_tenant_cache_stats(self) -> Dict:
+        """Get resident tenant, eviction and reload statistics for monitoring"""
+        return self.company_data.stats()
+
     def get_analytics(self, company_id: str) -> Dict:
         """Get analytics for company interactions"""
         if company_id not in self.chat_history:
@@ -324,7 +1109,7 @@ class EnhancedCompanyBot:
         total = len(history)
         avg_confidence = sum(chat['confidence'] for chat in history) / total if total > 0 else 0
         
-        recent_topics = [chat['topic'] for chat in history[-10:]]
+        recent_topics = [chat['topic'] for chat in history[-10:] if chat['topic']]
         topic_counts = Counter(recent_topics).most_common()
 
         return {
@@ -334,18 +1119,110 @@ class EnhancedCompanyBot:
             "error_rate": len(self.error_log) / total if total > 0 else 0
         }
 
-# Create singleton instance
-bot_instance = EnhancedCompanyBot()
+# Singleton instance, constructed on first use so importing this module
+# does not load the embedding model
+_bot: Optional[EnhancedCompanyBot] = None
+_bot_lock = threading.Lock()
+_readiness = {'ready': False, 'model_loaded': False, 'warm_tenants': [], 'error': None}
+
+def get_bot() -> EnhancedCompanyBot:
+    global _bot
+    if _bot is None:
+        with _bot_lock:
+            if _bot is None:
+                _bot = EnhancedCompanyBot()
+                _readiness['model_loaded'] = True
+    return _bot
+
+def __getattr__(name: str):
+    # Keeps ``from app.bot import bot_instance`` working
+    if name == 'bot_instance':
+        return get_bot()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up(company_ids: Optional[List[str]] = None, retry_seconds: float = 0.0) -> Dict:
+    """Load the model, run one encode and load the given tenants' indexes.
+
+    Readiness is reported by ``get_readiness`` once this finishes; requests
+    arriving earlier are still served, they just pay the loading cost.
+    ``company_ids`` defaults to the comma-separated WARM_TENANTS variable.
+    With ``retry_seconds`` a failed warm-up is retried after that long
+    until it succeeds.
+    """
+    if company_ids is None:
+        company_ids = [c.strip() for c in os.getenv('WARM_TENANTS', '').split(',') if c.strip()]
+    while True:
+        try:
+            bot = get_bot()
+            bot._create_embeddings(['warm up'])  # First forward pass allocates the runtime's buffers
+            for company_id in company_ids:
+                if (bot._get_company(company_id) is not None and
+                        company_id not in _readiness['warm_tenants']):
+                    _readiness['warm_tenants'].append(company_id)
+            _readiness['error'] = None
+            _readiness['ready'] = True
+            break
+        except Exception as e:
+            _readiness['error'] = str(e)
+            print(f"Warm-up error: {str(e)}")
+            if retry_seconds <= 0:
+                break
+            time.sleep(retry_seconds)
+    return get_readiness()
+
+def skip_warm_up():
+    """Report ready without warming up; the model loads on first use instead"""
+    _readiness['ready'] = True
+
+def get_readiness() -> Dict:
+    return dict(_readiness, warm_tenants=list(_readiness['warm_tenants']))
 
 # Export public API functions
 def process_message(company_id: str, message: str) -> Tuple[str, float, str, str]:
-    return bot_instance.get_response(company_id, message)
+    return get_bot().get_response(company_id, message)
+
+async def process_message_async(company_id: str, message: str) -> Tuple[str, float, str, str]:
+    # Constructing the bot loads the model, which must not happen on the event loop
+    bot = _bot if _bot is not None else await asyncio.get_running_loop().run_in_executor(
+        None, get_bot)
+    return await bot.get_response_async(company_id, message)
 
-def add_company_knowledge(company_id: str, texts: List[str], sources: List[str]) -> bool:
-    return bot_instance.add_company_data(company_id, texts, sources)
+async def stream_message_async(company_id: str, message: str) -> AsyncIterator[Dict]:
+    bot = _bot if _bot is not None else await asyncio.get_running_loop().run_in_executor(
+        None, get_bot)
+    async for event in bot.stream_response_async(company_id, message):
+        yield event
+
+def add_company_knowledge(company_id: str, texts: List[str], sources: List[str],
+                          replace: bool = False) -> bool:
+    return get_bot().add_company_data(company_id, texts, sources, replace)
+
+def delete_company_documents(company_id: str, sources: List[str]) -> int:
+    return get_bot().delete_company_documents(company_id, sources)
 
 def get_analytics(company_id: str) -> Dict:
-    return bot_instance.get_analytics(company_id)
+    return get_bot().get_analytics(company_id)
 
 def get_error_stats() -> Dict:
-    return bot_instance.get_error_stats()
\ No newline at end of file
+    return get_bot().get_error_stats()
+
+def get_embedding_cache_stats() -> Dict:
+    return get_bot().get_embedding_cache_stats()
+
+def get_ingest_stats() -> Dict:
+    return get_bot().get_ingest_stats()
+
+def get_query_batch_stats() -> Dict:
+    return get_bot().get_query_batch_stats()
+
+def get_stream_stats() -> Dict:
+    return get_bot().get_stream_stats()
+
+def get_answer_cache_stats() -> Dict:
+    return get_bot().get_answer_cache_stats()
+
+def get_topic_stats() -> Dict:
+    return get_bot().get_topic_stats()
+
+def get_tenant_cache_stats() -> Dict:
+    return get_bot().get_tenant_cache_stats()
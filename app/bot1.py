@@ -4,9 +4,9 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import re
-import openai
 from dotenv import load_dotenv
 import os
+from .llm import get_openai_client
 
 # Load environment variables
 load_dotenv()
@@ -51,7 +51,7 @@ class EnhancedCompanyBot:
     def _extract_topic(self, query: str, context: str) -> str:
         """Extract the main topic from query and context"""
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = get_openai_client()
             prompt = f"""Extract the main topic being discussed.
             Query: {query}
             Context: {context}
@@ -88,7 +88,7 @@ class EnhancedCompanyBot:
         if not self.current_conversation['current_topic']:
             return message
             
-        client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        client = get_openai_client()
         prompt = f"""Previous topic: {self.current_conversation['current_topic']}
         Previous query: {self.current_conversation['last_query']}
         Follow-up question: {message}
@@ -113,7 +113,7 @@ class EnhancedCompanyBot:
     def _get_openai_summary(self, context: str, question: str) -> str:
         """Get a concise answer from OpenAI based on context"""
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = get_openai_client()
             
             prompt = f"""Given the context below, provide a specific, factual answer with exact details from the document.
             If discussing policies or procedures, include key specifics like numbers, durations, or requirements.
@@ -4,9 +4,9 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import re
-import openai
 from dotenv import load_dotenv
 import os
+from .llm import get_openai_client
 
 # Load environment variables
 load_dotenv()
@@ -51,7 +51,7 @@ class EnhancedCompanyBot:
     def _extract_topic(self, query: str, context: str) -> str:
         """Extract the main topic from query and context"""
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = get_openai_client()
             prompt = f"""Identify the core technical/business topic from this interaction:
             Query: {query}
             Context: {context}
@@ -74,7 +74,7 @@ class EnhancedCompanyBot:
     def _enhance_query(self, query: str) -> str:
         """Universal query normalization with conversation awareness"""
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = get_openai_client()
             prompt = f"""Improve this query for technical document search:
             1. Correct spelling/grammar
             2. Expand domain-specific abbreviations
@@ -117,7 +117,7 @@ class EnhancedCompanyBot:
             return message
             
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = get_openai_client()
             prompt = f"""Previous Topic: {self.current_conversation['current_topic']}
             Last Query: {self.current_conversation['last_query']}
             Follow-up: {message}
@@ -141,7 +141,7 @@ class EnhancedCompanyBot:
     def _get_openai_summary(self, context: str, question: str) -> str:
         """Get a precise, numbers-focused answer from OpenAI"""
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = get_openai_client()
             
             prompt = f"""Answer STRICTLY using the context. Follow these rules:
             1. Cite EXACT numbers/dates/percentages when available
@@ -2,24 +2,61 @@ from typing import Dict, List, Tuple
 import numpy as np
 from datetime import datetime
 import re
-import openai
 from dotenv import load_dotenv
 import os
-from rank_bm25 import BM25Okapi
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+from scipy import sparse
 import torch
 from collections import Counter
+from .bm25 import SparseBM25
+from .llm import get_openai_client
 
 # Load environment variables
 load_dotenv()
 
+class HashedTfidf:
+    """Stateless hashing TF-IDF with stored document frequencies.
+
+    Terms are hashed into a fixed feature space, so there is no vocabulary
+    to refit; only this index's document frequencies are kept. Mirrors the
+    fit_transform/transform interface of TfidfVectorizer.
+    """
+
+    def __init__(self, n_features: int = 2 ** 18):
+        self.vectorizer = HashingVectorizer(n_features=n_features, stop_words='english',
+                                            alternate_sign=False, norm=None)
+        self.n_docs = 0
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+
+    @property
+    def idf(self) -> np.ndarray:
+        """Smoothed idf, same formula as TfidfVectorizer"""
+        return np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+
+    def fit_transform(self, texts: List[str]) -> sparse.csr_matrix:
+        counts = self.vectorizer.transform(texts).tocsr()
+        counts.sum_duplicates()
+        self.n_docs = counts.shape[0]
+        self.doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+        return self._weight(counts)
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        return self._weight(self.vectorizer.transform(texts))
+
+    def _weight(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        return normalize(counts @ sparse.diags(self.idf))
+
 class EnhancedCompanyBot:
     def __init__(self):
         # Initialize models and vectorizers
         self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.tfidf_vectorizer = TfidfVectorizer(stop_words='english')
+
+        # TF-IDF models are per company: 'fitted' learns a vocabulary per
+        # company, 'hashing' needs no fitting at all
+        self.tfidf_mode = os.getenv('TFIDF_MODE', 'fitted')
         
         # Storage for company data
         self.company_data: Dict[str, Dict] = {}
@@ -86,17 +123,19 @@ class EnhancedCompanyBot:
             
             # Create embeddings and TF-IDF vectors
             embeddings = self._create_embeddings(all_chunks)
-            tfidf_matrix = self.tfidf_vectorizer.fit_transform(all_chunks)
+            tfidf_vectorizer = self._new_tfidf_vectorizer()
+            tfidf_matrix = tfidf_vectorizer.fit_transform(all_chunks)
             
             # Create BM25 index
             tokenized_chunks = [chunk.lower().split() for chunk in all_chunks]
-            bm25 = BM25Okapi(tokenized_chunks)
+            bm25 = SparseBM25.build(tokenized_chunks)
             
             # Store all data
             self.company_data[company_id] = {
                 'texts': all_chunks,
                 'sources': chunk_sources,
                 'embeddings': embeddings,
+                'tfidf_vectorizer': tfidf_vectorizer,
                 'tfidf_matrix': tfidf_matrix,
                 'bm25': bm25,
                 'last_updated': datetime.now()
@@ -107,6 +146,12 @@ class EnhancedCompanyBot:
             self._log_error("Company data addition error", str(e))
             return False
 
+    def _new_tfidf_vectorizer(self):
+        """Create a company-scoped TF-IDF model for the configured mode"""
+        if self.tfidf_mode == 'hashing':
+            return HashedTfidf()
+        return TfidfVectorizer(stop_words='english')
+
     def _hybrid_search(self, query: str, company_id: str) -> List[Tuple[int, float]]:
         """Perform hybrid search combining semantic and BM25"""
         try:
@@ -120,7 +165,7 @@ class EnhancedCompanyBot:
             )[0]
             
             # TF-IDF search
-            tfidf_query = self.tfidf_vectorizer.transform([query])
+            tfidf_query = company['tfidf_vectorizer'].transform([query])
             tfidf_similarities = cosine_similarity(tfidf_query, company['tfidf_matrix'])[0]
             
             # BM25 search
@@ -187,7 +232,7 @@ class EnhancedCompanyBot:
     def _get_openai_summary(self, context: str, question: str) -> str:
         """Get a precise answer from OpenAI"""
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = get_openai_client()
             
             prompt = f"""Answer STRICTLY using the context. Follow these rules:
             1. Cite EXACT numbers/dates/percentages when available
@@ -233,7 +278,7 @@ class EnhancedCompanyBot:
             return message
             
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = get_openai_client()
             prompt = f"""Previous Topic: {self.current_conversation['current_topic']}
             Last Query: {self.current_conversation['last_query']}
             Follow-up: {message}
@@ -257,7 +302,7 @@ class EnhancedCompanyBot:
     def _extract_topic(self, query: str, context: str) -> str:
         """Extract the main topic from query and context"""
         try:
-            client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            client = get_openai_client()
             prompt = f"""Identify the core technical/business topic from this interaction:
             Query: {query}
             Context: {context}
@@ -0,0 +1,95 @@
+from typing import Dict, Iterator, List
+from array import array
+import numpy as np
+
+class ChunkStore:
+    """Chunk texts and sources of one segment in a compact, mmap-able form.
+
+    All texts live in one UTF-8 buffer; chunk ``i`` is
+    ``buffer[offsets[i]:offsets[i + 1]]``. Sources are interned: every chunk
+    stores an int32 id into ``source_table``, so a document's name is kept
+    once however many chunks it has. Strings are only materialized for the
+    chunks a caller asks for.
+    """
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray,
+                 source_ids: np.ndarray, source_table: List[str]):
+        self.buffer = buffer          # uint8, concatenated UTF-8 texts
+        self.offsets = offsets        # int64, len(chunks) + 1 boundaries into buffer
+        self.source_ids = source_ids  # int32, row -> index into source_table
+        self.source_table = source_table
+        self._source_index = {source: i for i, source in enumerate(source_table)}
+
+    @classmethod
+    def build(cls, texts: List[str], sources: List[str]) -> 'ChunkStore':
+        """Pack parallel lists of chunk texts and their sources"""
+        builder = ChunkStoreBuilder()
+        for text, source in zip(texts, sources):
+            builder.append(text, source)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return (self.buffer.nbytes + self.offsets.nbytes + self.source_ids.nbytes +
+                sum(len(source) for source in self.source_table))
+
+    def text(self, row: int) -> str:
+        """Materialize one chunk's text"""
+        return self.buffer[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+    def source(self, row: int) -> str:
+        return self.source_table[self.source_ids[row]]
+
+    def iter_texts(self) -> Iterator[str]:
+        """Materialize texts one at a time (for indexing and hashing)"""
+        for row in range(len(self)):
+            yield self.text(row)
+
+    def rows_with_sources(self, sources) -> np.ndarray:
+        """Boolean mask of chunks whose source is in ``sources``"""
+        ids = [self._source_index[source] for source in sources if source in self._source_index]
+        return np.isin(self.source_ids, ids)
+
+    def sources_of(self, rows: np.ndarray) -> List[str]:
+        """Distinct sources of the given rows"""
+        return [self.source_table[i] for i in np.unique(self.source_ids[rows])]
+
+    def to_state(self) -> Dict:
+        return {
+            'buffer': self.buffer,
+            'offsets': self.offsets,
+            'source_ids': self.source_ids,
+            'source_table': self.source_table
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'ChunkStore':
+        return cls(state['buffer'], state['offsets'], state['source_ids'], state['source_table'])
+
+class ChunkStoreBuilder:
+    """Appends chunks one at a time straight into the arena layout"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offsets = array('q', [0])
+        self._source_ids = array('i')
+        self._table: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._source_ids)
+
+    def append(self, text: str, source: str) -> int:
+        """Add a chunk and return its row"""
+        self._buffer += text.encode('utf-8')
+        self._offsets.append(len(self._buffer))
+        self._source_ids.append(self._table.setdefault(source, len(self._table)))
+        return len(self._source_ids) - 1
+
+    def build(self) -> ChunkStore:
+        return ChunkStore(np.frombuffer(bytes(self._buffer), dtype=np.uint8),
+                          np.frombuffer(self._offsets, dtype=np.int64).copy(),
+                          np.frombuffer(self._source_ids, dtype=np.int32).copy(),
+                          list(self._table))
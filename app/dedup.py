@@ -0,0 +1,69 @@
+from typing import Dict, List
+import zlib
+import numpy as np
+
+_PRIME = (1 << 31) - 1  # hash values are reduced mod this so a * x fits in uint64
+
+class NearDuplicateIndex:
+    """Incremental MinHash/LSH index of the texts seen so far.
+
+    ``add`` returns the index of the first earlier text the new one nearly
+    duplicates, or its own index if there is none. Candidates come from LSH
+    banding of MinHash signatures over word shingles; a text joins a
+    candidate only if their estimated Jaccard similarity reaches
+    ``threshold``. Only representatives are bucketed, so groups never chain.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 3, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[int, np.ndarray] = {}  # representatives only
+        self._count = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (num_perm uint32 values) of a text's word shingles"""
+        words = text.lower().split()
+        shingles = {' '.join(words[j:j + self.shingle_size])
+                    for j in range(max(1, len(words) - self.shingle_size + 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) % _PRIME for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        if not len(hashes):
+            return np.full(self.num_perm, _PRIME, dtype=np.uint32)
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def add(self, text: str) -> int:
+        """Index a text; return its representative's index (its own if new)"""
+        index = self._count
+        self._count += 1
+        signature = self.signature(text)
+        rows_per_band = self.num_perm // self.bands
+        keys = [signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes()
+                for band in range(self.bands)]
+
+        candidates = sorted({j for band, key in enumerate(keys)
+                             for j in self._buckets[band].get(key, ())})
+        for j in candidates:
+            if np.mean(signature == self._signatures[j]) >= self.threshold:
+                return j
+
+        self._signatures[index] = signature
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(index)
+        return index
+
+def near_duplicate_representatives(texts: List[str], threshold: float = 0.8,
+                                   num_perm: int = 64, bands: int = 16) -> np.ndarray:
+    """Map every text to the index of the first earlier text it nearly duplicates.
+
+    Texts without a match map to themselves, so ``representatives[i] == i``
+    marks the texts to keep.
+    """
+    index = NearDuplicateIndex(threshold, num_perm, bands)
+    return np.array([index.add(text) for text in texts], dtype=np.int64)
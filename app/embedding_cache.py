@@ -0,0 +1,82 @@
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+import numpy as np
+
+class QueryEmbeddingCache:
+    """Bounded LRU cache of query embeddings.
+
+    Keys are (model id, normalized query text), so switching models never
+    serves a stale vector. Entries are evicted least-recently-used first
+    once either the byte budget or the entry limit is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entries: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[str, str], np.ndarray]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Counters for monitoring
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Case- and whitespace-insensitive key (the model is uncased)"""
+        return ' '.join(text.lower().split())
+
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding and mark it recently used, or None"""
+        key = (model_id, self.normalize(text))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, model_id: str, text: str, embedding: np.ndarray):
+        """Cache an embedding, evicting old entries to stay within budget"""
+        embedding = np.array(embedding, copy=True)
+        embedding.setflags(write=False)  # shared between requests
+        if embedding.nbytes > self.max_bytes:
+            return
+
+        key = (model_id, self.normalize(text))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = embedding
+            self._bytes += embedding.nbytes
+
+            while (self._bytes > self.max_bytes or
+                   (self.max_entries is not None and len(self._entries) > self.max_entries)):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,224 @@
+"""Shared embedding service for all API worker processes.
+
+Without it every uvicorn worker loads its own SentenceTransformer and torch,
+and their inference threads compete for the same cores. The service process
+owns the only copy of the model, pins its thread pools, and serves
+encode requests over a Unix socket:
+
+    python -m app.embedding_service --socket /tmp/embeddings.sock --threads 4
+
+API workers started with ``EMBEDDING_SERVICE_SOCKET=/tmp/embeddings.sock``
+then use ``EmbeddingServiceClient`` instead of loading the model.
+
+Messages are frames of ``<II`` (header length, body length), a UTF-8 JSON
+header and a raw body; embeddings travel as float32 bytes.
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import numpy as np
+from .batching import EmbeddingBatcher
+from .encoders import ENCODER_BACKENDS, create_encoder
+
+_FRAME = struct.Struct('<II')
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        part = sock.recv(size - len(data))
+        if not part:
+            raise ConnectionError("Embedding service connection closed")
+        data += part
+    return bytes(data)
+
+def _send_frame(sock: socket.socket, header: Dict, body: bytes = b''):
+    encoded = json.dumps(header).encode('utf-8')
+    sock.sendall(_FRAME.pack(len(encoded), len(body)) + encoded + body)
+
+def _recv_frame(sock: socket.socket) -> Tuple[Dict, bytes]:
+    header_size, body_size = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+    header = json.loads(_recv_exactly(sock, header_size).decode('utf-8'))
+    return header, _recv_exactly(sock, body_size)
+
+class EmbeddingService:
+    """The model, its thread settings and a batcher shared by all clients.
+
+    Single-text requests (queries) from different workers are coalesced by
+    an ``EmbeddingBatcher``; multi-text requests (ingest batches, or
+    queries a worker already batched) are encoded as they are. One forward
+    pass runs at a time so inference never uses more than ``threads`` cores.
+    """
+
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', backend: str = 'torch',
+                 threads: Optional[int] = None, interop_threads: int = 1,
+                 max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.model_name = model_name
+        self.backend = backend
+        self.threads = threads
+        self.encoder = create_encoder(model_name, backend=backend, threads=threads,
+                                      interop_threads=interop_threads)
+        self.dimension = self.encoder.get_sentence_embedding_dimension()
+        self._model_lock = threading.Lock()
+        self.batcher = EmbeddingBatcher(self._encode, max_batch_size=max_batch_size,
+                                        max_wait_ms=max_wait_ms)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        with self._model_lock:
+            return self.encoder.encode(texts)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if len(texts) == 1:
+            return self.batcher.embed(texts[0])[None, :]
+        return self._encode(texts)
+
+    def info(self) -> Dict:
+        return {
+            "model": self.model_name,
+            "dimension": self.dimension,
+            "backend": self.backend,
+            "threads": self.threads,
+            "batching": self.batcher.stats()
+        }
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serves frames on one client connection until it closes"""
+
+    def handle(self):
+        service: EmbeddingService = self.server.service
+        while True:
+            try:
+                request, _ = _recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            try:
+                if request.get('op') == 'info':
+                    _send_frame(self.request, service.info())
+                    continue
+                embeddings = np.ascontiguousarray(service.encode(request['texts']),
+                                                  dtype=np.float32)
+            except Exception as e:
+                _send_frame(self.request, {"error": str(e)})
+                continue
+            _send_frame(self.request, {"model": service.model_name,
+                                       "shape": list(embeddings.shape)},
+                        embeddings.tobytes())
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: EmbeddingService):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # Left behind by a previous run
+        self.service = service
+        super().__init__(socket_path, _RequestHandler)
+
+class EmbeddingServiceClient:
+    """Encodes through a running ``EmbeddingService`` instead of a local model.
+
+    Has the same interface as the ``app.encoders`` backends. Connections
+    are opened on demand and reused across threads; a request that fails
+    on a reused connection (e.g. after a service restart) is retried once
+    on a fresh one.
+    """
+
+    def __init__(self, socket_path: str, model_name: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.timeout = timeout
+        self._idle: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._dimension = None
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _request(self, header: Dict) -> Tuple[Dict, bytes]:
+        with self._lock:
+            sock = self._idle.pop() if self._idle else None
+        reused = sock is not None
+        if sock is None:
+            sock = self._connect()
+
+        try:
+            _send_frame(sock, header)
+            response = _recv_frame(sock)
+        except (ConnectionError, OSError):
+            sock.close()
+            if not reused:
+                raise
+            sock = self._connect()
+            try:
+                _send_frame(sock, header)
+                response = _recv_frame(sock)
+            except (ConnectionError, OSError):
+                sock.close()
+                raise
+
+        with self._lock:
+            self._idle.append(sock)
+        if 'error' in response[0]:
+            raise RuntimeError(f"Embedding service error: {response[0]['error']}")
+        return response
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        header, body = self._request({"op": "encode", "texts": list(texts)})
+        # Embeddings from a different model are not comparable with stored ones
+        if header['model'] != self.model_name:
+            raise RuntimeError(f"Embedding service runs {header['model']}, "
+                               f"expected {self.model_name}")
+        return np.frombuffer(body, dtype=np.float32).reshape(header['shape']).copy()
+
+    def info(self) -> Dict:
+        return self._request({"op": "info"})[0]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = self.info()['dimension']
+        return self._dimension
+
+    def close(self):
+        with self._lock:
+            for sock in self._idle:
+                sock.close()
+            self._idle.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding service")
+    parser.add_argument('--socket', default=os.getenv('EMBEDDING_SERVICE_SOCKET',
+                                                      '/tmp/embeddings.sock'))
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--backend', choices=ENCODER_BACKENDS,
+                        default=os.getenv('EMBEDDING_BACKEND', 'torch'))
+    parser.add_argument('--threads', type=int,
+                        default=int(os.getenv('EMBEDDING_THREADS', '0')) or None)
+    parser.add_argument('--interop-threads', type=int, default=1)
+    parser.add_argument('--batch-size', type=int,
+                        default=int(os.getenv('QUERY_BATCH_SIZE', '32')))
+    parser.add_argument('--batch-wait-ms', type=float,
+                        default=float(os.getenv('QUERY_BATCH_WAIT_MS', '2')))
+    args = parser.parse_args()
+
+    service = EmbeddingService(args.model, backend=args.backend, threads=args.threads,
+                               interop_threads=args.interop_threads,
+                               max_batch_size=args.batch_size, max_wait_ms=args.batch_wait_ms)
+    with EmbeddingServer(args.socket, service) as server:
+        print(f"Embedding service ({service.model_name} on {service.backend}, "
+              f"{service.threads or 'default'} threads) "
+              f"listening on {args.socket}")
+        server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+from typing import List, Optional
+import json
+import os
+import numpy as np
+
+ENCODER_BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+
+def _configure_torch_threads(threads: Optional[int], interop_threads: Optional[int]):
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            pass  # Only settable before torch's first parallel region
+
+class TorchEncoder:
+    """SentenceTransformer on PyTorch, optionally with int8 dynamic quantization.
+
+    ``quantize=True`` replaces the model's Linear layers with dynamically
+    quantized int8 ones, which roughly halves encode time on CPUs with
+    VNNI/AVX2 at a small cost in embedding fidelity.
+    """
+
+    def __init__(self, model_name: str, quantize: bool = False, threads: Optional[int] = None,
+                 interop_threads: Optional[int] = None, batch_size: int = 32):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        _configure_torch_threads(threads, interop_threads)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name, device='cpu')
+        if quantize:
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear},
+                                                             dtype=torch.qint8)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.model.encode(texts, batch_size=self.batch_size, convert_to_tensor=True)
+        return embeddings.cpu().numpy()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+class OnnxEncoder:
+    """The same model exported to ONNX and run by ONNX Runtime.
+
+    The export covers the whole SentenceTransformer pipeline (transformer,
+    pooling and normalization), so outputs match the PyTorch encoder. It is
+    written to ``model_dir`` once, together with the tokenizer; later
+    starts only need ``onnxruntime`` and ``transformers``' tokenizer.
+    ``quantize=True`` runs a dynamically int8-quantized copy of the graph.
+    """
+
+    def __init__(self, model_name: str, model_dir: str, quantize: bool = False,
+                 threads: Optional[int] = None, interop_threads: Optional[int] = None,
+                 batch_size: int = 32):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("The onnx embedding backends need onnxruntime: "
+                              "pip install onnxruntime")
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        path = os.path.join(model_dir, 'model.onnx')
+        if not os.path.exists(path):
+            export_onnx(model_name, model_dir)
+        if quantize:
+            path = quantize_onnx(model_dir)
+
+        with open(os.path.join(model_dir, 'encoder.json')) as f:
+            config = json.load(f)
+        if config['model'] != model_name:
+            raise ValueError(f"{model_dir} holds an export of {config['model']}, not {model_name}")
+        self.max_seq_length = config['max_seq_length']
+        self.dimension = config['dimension']
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        if interop_threads:
+            options.inter_op_num_threads = interop_threads
+        self.session = onnxruntime.InferenceSession(path, options,
+                                                    providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        # Batches of similar length waste less compute on padding
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        for start in range(0, len(texts), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            features = self.tokenizer([texts[i] for i in rows], padding=True, truncation=True,
+                                      max_length=self.max_seq_length, return_tensors='np')
+            inputs = {name: features[name].astype(np.int64) for name in self.input_names}
+            embeddings[rows] = self.session.run(None, inputs)[0]
+        return embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+def export_onnx(model_name: str, model_dir: str):
+    """Export a SentenceTransformer pipeline and its tokenizer to ``model_dir``"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device='cpu').eval()
+    tokenizer = model.tokenizer
+    input_names = ['input_ids', 'attention_mask']
+    if 'token_type_ids' in tokenizer.model_input_names:
+        input_names.append('token_type_ids')
+
+    class Pipeline(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(dict(zip(input_names, inputs)))['sentence_embedding']
+
+    sample = tokenizer(['an example sentence'], return_tensors='pt')
+    os.makedirs(model_dir, exist_ok=True)
+    dynamic_axes = {name: {0: 'batch', 1: 'tokens'} for name in input_names}
+    dynamic_axes['sentence_embedding'] = {0: 'batch'}
+    with torch.no_grad():
+        torch.onnx.export(Pipeline(), tuple(sample[name] for name in input_names),
+                          os.path.join(model_dir, 'model.onnx'), input_names=input_names,
+                          output_names=['sentence_embedding'], dynamic_axes=dynamic_axes,
+                          opset_version=14)
+    tokenizer.save_pretrained(model_dir)
+    with open(os.path.join(model_dir, 'encoder.json'), 'w') as f:
+        json.dump({'model': model_name, 'max_seq_length': model.max_seq_length,
+                   'dimension': model.get_sentence_embedding_dimension()}, f)
+
+def quantize_onnx(model_dir: str) -> str:
+    """Path of the int8 dynamically quantized graph, created on first use"""
+    path = os.path.join(model_dir, 'model.int8.onnx')
+    if not os.path.exists(path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(os.path.join(model_dir, 'model.onnx'), path,
+                         weight_type=QuantType.QInt8)
+    return path
+
+def create_encoder(model_name: str, backend: str = 'torch', threads: Optional[int] = None,
+                   interop_threads: Optional[int] = None, model_dir: Optional[str] = None):
+    """Encoder with ``encode(texts) -> float32 array`` for the given backend"""
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; "
+                         f"expected one of {', '.join(ENCODER_BACKENDS)}")
+    quantize = backend.endswith('-int8')
+    if backend.startswith('onnx'):
+        model_dir = model_dir or os.path.join('data', 'onnx', model_name.replace('/', '_'))
+        return OnnxEncoder(model_name, model_dir, quantize=quantize, threads=threads,
+                           interop_threads=interop_threads)
+    return TorchEncoder(model_name, quantize=quantize, threads=threads,
+                        interop_threads=interop_threads)
@@ -0,0 +1,59 @@
+from typing import Callable, Dict
+import numpy as np
+
+# Every strategy maps (cosine similarities, BM25 scores, semantic weight) to
+# one combined score per candidate in the 0-1 range, so the confidence
+# threshold in get_response keeps working whichever strategy is selected.
+
+def weighted_fusion(similarities: np.ndarray, bm25_scores: np.ndarray,
+                    weight: float) -> np.ndarray:
+    """Linear blend of cosine mapped to 0-1 and max-normalized BM25"""
+    semantic = (similarities + 1) / 2
+    top = bm25_scores.max() if len(bm25_scores) else 0.0
+    lexical = bm25_scores / top if top > 0 else bm25_scores
+    return weight * semantic + (1 - weight) * lexical
+
+def reciprocal_rank_fusion(similarities: np.ndarray, bm25_scores: np.ndarray,
+                           weight: float, k: int = 60) -> np.ndarray:
+    """Weighted RRF, scaled so rank 1 in both lists scores 1.0"""
+    return (weight * (k + 1) / (k + _ranks(similarities)) +
+            (1 - weight) * (k + 1) / (k + _ranks(bm25_scores)))
+
+def zscore_fusion(similarities: np.ndarray, bm25_scores: np.ndarray,
+                  weight: float) -> np.ndarray:
+    """Blend of standardized scores, squashed to 0-1 with a logistic"""
+    combined = weight * _standardize(similarities) + (1 - weight) * _standardize(bm25_scores)
+    return 1 / (1 + np.exp(-combined))
+
+FUSION_STRATEGIES: Dict[str, Callable[[np.ndarray, np.ndarray, float], np.ndarray]] = {
+    'weighted': weighted_fusion,
+    'rrf': reciprocal_rank_fusion,
+    'zscore': zscore_fusion
+}
+
+def fuse_scores(similarities: np.ndarray, bm25_scores: np.ndarray, weight: float,
+                strategy: str = 'weighted') -> np.ndarray:
+    """Combine semantic and lexical scores with the named strategy"""
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy: {strategy}")
+    return FUSION_STRATEGIES[strategy](similarities, bm25_scores, weight)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first, without a full sort"""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """1-based rank of every score, highest first"""
+    ranks = np.empty(len(scores), dtype=np.float64)
+    ranks[np.argsort(-scores, kind='stable')] = np.arange(1, len(scores) + 1)
+    return ranks
+
+def _standardize(scores: np.ndarray) -> np.ndarray:
+    std = scores.std() if len(scores) else 0.0
+    if std == 0:
+        return np.zeros(len(scores), dtype=np.float64)
+    return (scores - scores.mean()) / std
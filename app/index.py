@@ -0,0 +1,328 @@
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
+import hashlib
+import threading
+import uuid
+import numpy as np
+from .ann import IVFFlatIndex
+from .bm25 import SparseBM25
+from .chunks import ChunkStore, ChunkStoreBuilder
+from .quantize import QuantizedEmbeddings
+
+def tokenize(text: str) -> List[str]:
+    """Tokenizer shared by indexing and querying"""
+    return text.lower().split()
+
+def chunk_hashes(texts: Iterable[str], model_id: str) -> np.ndarray:
+    """Content hashes of chunks: 16-byte digests of model id + whitespace-normalized text"""
+    prefix = model_id.encode('utf-8') + b'\x00'
+    digests = [hashlib.blake2b(prefix + ' '.join(text.split()).encode('utf-8'),
+                               digest_size=16).digest() for text in texts]
+    return np.array(digests, dtype='S16')
+
+def new_segment_id() -> str:
+    """Generate a unique segment identifier"""
+    return uuid.uuid4().hex[:12]
+
+class Segment:
+    """An immutable batch of chunks with its own embeddings and BM25 index.
+
+    Only the ``deleted`` mask changes after creation; deleting a document
+    tombstones its chunks and a later merge drops them for good.
+    """
+
+    def __init__(self, segment_id: str, chunk_ids: np.ndarray, chunks: ChunkStore,
+                 embeddings: np.ndarray, bm25: SparseBM25,
+                 deleted: Optional[np.ndarray] = None,
+                 created_at: Optional[datetime] = None,
+                 ann: Optional[IVFFlatIndex] = None,
+                 quantized: Optional[QuantizedEmbeddings] = None,
+                 hashes: Optional[np.ndarray] = None,
+                 duplicate_sources: Optional[Dict[int, List[str]]] = None,
+                 removed_sources: Optional[Iterable[str]] = None):
+        self.segment_id = segment_id
+        self.chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        self.chunks = chunks  # texts and sources, materialized per chunk on demand
+        self.embeddings = embeddings
+        self.bm25 = bm25
+        self.deleted = (np.zeros(len(chunks), dtype=bool) if deleted is None
+                        else np.asarray(deleted, dtype=bool).copy())
+        self.created_at = created_at or datetime.now()
+        self.ann = ann
+        self.quantized = quantized  # compact copy of the embeddings for scans
+        self.hashes = hashes  # chunk content hashes, see chunk_hashes
+        # Rows standing in for near-duplicate chunks -> their other sources
+        self.duplicate_sources = dict(duplicate_sources or {})
+        self.removed_sources = set(removed_sources or ())  # tombstoned sources
+        self._nbytes: Optional[int] = None
+
+    @classmethod
+    def build(cls, segment_id: str, chunk_ids: np.ndarray, chunks: ChunkStore,
+              embeddings: np.ndarray,
+              ann_min_chunks: Optional[int] = None,
+              quantization: Optional[str] = None,
+              hashes: Optional[np.ndarray] = None,
+              duplicate_sources: Optional[Dict[int, List[str]]] = None) -> 'Segment':
+        """Create a segment, building its BM25 index from the chunk texts.
+
+        An ANN index is built too once the segment has ``ann_min_chunks``
+        chunks; smaller segments are cheap enough to scan exactly. With a
+        ``quantization`` ('float16' or 'int8') a compact copy of the
+        embeddings is kept for full scans.
+        """
+        bm25 = SparseBM25.build(tokenize(text) for text in chunks.iter_texts())
+        ann = None
+        if ann_min_chunks is not None and len(chunks) >= ann_min_chunks:
+            ann = IVFFlatIndex.build(embeddings)
+        quantized = None
+        if quantization is not None:
+            quantized = QuantizedEmbeddings.quantize(embeddings, quantization)
+        return cls(segment_id, chunk_ids, chunks, embeddings, bm25,
+                   ann=ann, quantized=quantized, hashes=hashes,
+                   duplicate_sources=duplicate_sources)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def live_count(self) -> int:
+        return int(len(self.chunks) - self.deleted.sum())
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the segment (computed once; segments are immutable)"""
+        if self._nbytes is None:
+            # With a quantized copy, search reads the codes and scales; the
+            # float32 matrix is memory-mapped and only touched for rescoring rows
+            vectors = (self.quantized.nbytes if self.quantized is not None
+                       else self.embeddings.nbytes)
+            self._nbytes = (self.chunks.nbytes + self.chunk_ids.nbytes + self.deleted.nbytes +
+                            vectors + self.bm25.nbytes +
+                            (self.ann.nbytes if self.ann is not None else 0) +
+                            (self.hashes.nbytes if self.hashes is not None else 0))
+        return self._nbytes
+
+    def position(self, chunk_id: int) -> Optional[int]:
+        """Return the row of a chunk id in this segment, or None"""
+        pos = int(np.searchsorted(self.chunk_ids, chunk_id))
+        if pos < len(self.chunk_ids) and self.chunk_ids[pos] == chunk_id:
+            return pos
+        return None
+
+    def row_sources(self, row: int) -> List[str]:
+        """All sources of a chunk that have not been tombstoned"""
+        return [source for source in [self.chunks.source(row)] + self.duplicate_sources.get(row, [])
+                if source not in self.removed_sources]
+
+    def all_sources(self) -> Set[str]:
+        """Every source with a chunk in this segment"""
+        sources = set(self.chunks.source_table)
+        for others in self.duplicate_sources.values():
+            sources.update(others)
+        return sources
+
+    def tombstone_sources(self, sources: Iterable[str]) -> int:
+        """Remove the given sources; chunks left without a source are deleted"""
+        sources = set(sources) & self.all_sources()
+        if not sources:
+            return 0
+
+        self.removed_sources |= sources
+        hits = self.chunks.rows_with_sources(self.removed_sources)
+        for row, others in self.duplicate_sources.items():
+            if hits[row] and any(other not in self.removed_sources for other in others):
+                hits[row] = False  # a near-duplicate copy from another document is still live
+        newly_deleted = hits & ~self.deleted
+        self.deleted |= hits
+        return int(newly_deleted.sum())
+
+class CompanyIndex:
+    """Append-only collection of segments making up one company's knowledge.
+
+    Chunk ids are allocated monotonically and survive merges, so search
+    results stay resolvable while segments are being compacted.
+    """
+
+    def __init__(self, segments: Optional[List[Segment]] = None,
+                 next_chunk_id: int = 0, last_updated: Optional[datetime] = None,
+                 ann_min_chunks: Optional[int] = None,
+                 quantization: Optional[str] = None):
+        self.segments: List[Segment] = list(segments or [])
+        self.next_chunk_id = next_chunk_id
+        self.last_updated = last_updated or datetime.now()
+        self.ann_min_chunks = ann_min_chunks
+        self.quantization = quantization
+        self.lock = threading.RLock()
+        self.merging = False
+        self.revision: Optional[str] = None  # of the manifest last loaded or saved
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the searchable content does (merges leave it alone)"""
+        return self.last_updated.isoformat()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by all segments"""
+        with self.lock:
+            return sum(segment.nbytes for segment in self.segments)
+
+    def allocate_chunk_ids(self, count: int) -> np.ndarray:
+        """Reserve ``count`` consecutive chunk ids"""
+        with self.lock:
+            start = self.next_chunk_id
+            self.next_chunk_id += count
+        return np.arange(start, start + count, dtype=np.int64)
+
+    def add_segment(self, segment: Segment, replace: bool = False) -> int:
+        """Append a segment, tombstoning older chunks from the same sources.
+
+        With ``replace`` every older chunk is tombstoned instead, in the
+        same step, so the index is never seen empty in between.
+        """
+        with self.lock:
+            replaced = self.delete_all() if replace else 0
+            for existing in self.segments:
+                replaced += existing.tombstone_sources(segment.all_sources())
+            self.segments.append(segment)
+            self.last_updated = datetime.now()
+            return replaced
+
+    def delete_sources(self, sources: Iterable[str]) -> int:
+        """Tombstone all chunks belonging to the given sources"""
+        sources = set(sources)
+        with self.lock:
+            deleted = sum(segment.tombstone_sources(sources) for segment in self.segments)
+            if deleted:
+                self.last_updated = datetime.now()
+            return deleted
+
+    def delete_all(self) -> int:
+        """Tombstone every chunk in the index"""
+        with self.lock:
+            deleted = 0
+            for segment in self.segments:
+                deleted += segment.live_count
+                segment.deleted[:] = True
+            self.last_updated = datetime.now()
+            return deleted
+
+    def live_segments(self) -> List[Segment]:
+        """Snapshot of segments that still contain live chunks"""
+        with self.lock:
+            return [segment for segment in self.segments if segment.live_count > 0]
+
+    def live_sources(self) -> List[str]:
+        """Sorted list of documents that still have live chunks"""
+        sources = set()
+        for segment in self.live_segments():
+            sources.update(source for source in segment.chunks.sources_of(~segment.deleted)
+                           if source not in segment.removed_sources)
+            for row in segment.duplicate_sources:
+                if not segment.deleted[row]:
+                    sources.update(segment.row_sources(row))
+        return sorted(sources)
+
+    def find_chunks(self, hashes: np.ndarray) -> Dict[bytes, Tuple[Segment, int]]:
+        """Locate stored chunks (segment, row) with any of the given content hashes.
+
+        Tombstoned rows count too: their embeddings stay valid until a merge
+        drops them, which is what makes re-uploading a document cheap.
+        """
+        wanted = np.unique(hashes)
+        found: Dict[bytes, Tuple[Segment, int]] = {}
+        with self.lock:
+            segments = list(self.segments)
+        for segment in segments:
+            if segment.hashes is None or len(found) == len(wanted):
+                continue
+            for row in np.flatnonzero(np.isin(segment.hashes, wanted)):
+                found.setdefault(segment.hashes[row], (segment, int(row)))
+        return found
+
+    def get_chunk(self, chunk_id: int) -> Optional[Tuple[str, str]]:
+        """Resolve a chunk id to its (text, sources joined by ', '), or None if deleted"""
+        for segment in self.live_segments():
+            pos = segment.position(chunk_id)
+            if pos is not None and not segment.deleted[pos]:
+                return segment.chunks.text(pos), ', '.join(segment.row_sources(pos))
+        return None
+
+    def needs_merge(self, max_segments: int, max_deleted_ratio: float) -> bool:
+        """Check whether the index has too many segments or tombstones"""
+        with self.lock:
+            if self.merging or not self.segments:
+                return False
+            total = sum(len(segment) for segment in self.segments)
+            live = sum(segment.live_count for segment in self.segments)
+            deleted_ratio = 1 - live / total if total else 0.0
+            return len(self.segments) > max_segments or deleted_ratio > max_deleted_ratio
+
+    def merge(self, persist: Optional[Callable[[Segment], bool]] = None
+              ) -> Optional[Tuple[Optional[Segment], List[Segment]]]:
+        """Compact all current segments into one, dropping tombstoned chunks.
+
+        Returns ``(merged, removed)`` or None if a merge is already running.
+        ``merged`` is None when nothing live was left. Segments added while
+        the merge runs are left untouched. ``persist`` is called with the
+        merged segment (or None) before it replaces the old ones; if it
+        returns False the merge is abandoned and None is returned.
+        """
+        with self.lock:
+            if self.merging or not self.segments:
+                return None
+            self.merging = True
+            snapshot = list(self.segments)
+            removed_before = [set(segment.removed_sources) for segment in snapshot]
+
+        try:
+            # Build the merged segment outside the lock; searches keep using
+            # the old segments meanwhile. Embeddings are reused, not recomputed.
+            kept = [(segment, np.flatnonzero(~segment.deleted)) for segment in snapshot]
+            # Concurrent uploads can append segments out of chunk id order;
+            # merged rows are sorted by id, which Segment.position relies on
+            chunk_ids = np.concatenate([segment.chunk_ids[rows] for segment, rows in kept])
+            order = np.argsort(chunk_ids, kind='stable')
+            origins = [(segment, i) for segment, rows in kept for i in rows]
+            # Tombstoned sources are dropped; the first live one becomes primary
+            chunks = ChunkStoreBuilder()
+            duplicate_sources: Dict[int, List[str]] = {}
+            for k in order:
+                segment, i = origins[k]
+                sources = segment.row_sources(i) or [segment.chunks.source(i)]
+                row = chunks.append(segment.chunks.text(i), sources[0])
+                if len(sources) > 1:
+                    duplicate_sources[row] = sources[1:]
+            merged = None
+            if len(chunks):
+                merged = Segment.build(
+                    new_segment_id(),
+                    chunk_ids[order],
+                    chunks.build(),
+                    np.concatenate([np.asarray(segment.embeddings[rows])
+                                    for segment, rows in kept])[order],
+                    self.ann_min_chunks,
+                    self.quantization,
+                    (np.concatenate([segment.hashes[rows] for segment, rows in kept])[order]
+                     if all(segment.hashes is not None for segment in snapshot) else None),
+                    duplicate_sources
+                )
+
+            if persist is not None and not persist(merged):
+                return None
+
+            with self.lock:
+                # Carry over tombstones that landed while we were merging
+                if merged is not None:
+                    merged.deleted |= np.concatenate([segment.deleted[rows]
+                                                      for segment, rows in kept])[order]
+                    for segment, before in zip(snapshot, removed_before):
+                        merged.tombstone_sources(segment.removed_sources - before)
+
+                merged_ids = {id(segment) for segment in snapshot}
+                remaining = [segment for segment in self.segments if id(segment) not in merged_ids]
+                self.segments = ([merged] if merged is not None else []) + remaining
+                return merged, snapshot
+        finally:
+            with self.lock:
+                self.merging = False
@@ -5,7 +5,7 @@ import numpy as np
 from sklearn.cluster import KMeans
 import pandas as pd
 from .store import get_chat_history, get_data
-from .bot import bot_instance
+from .bot import get_bot
 
 class InsightsAnalyzer:
     def __init__(self):
@@ -61,7 +61,7 @@ class InsightsAnalyzer:
         messages = df['message'].tolist() if 'message' in df.columns else []
         
         # Use bot's embedding model to cluster similar questions
-        embeddings = bot_instance.model.encode(messages)
+        embeddings = get_bot().embedding_model.encode(messages)
         clusters = self._cluster_questions(embeddings)
         
         return {
@@ -0,0 +1,72 @@
+from typing import Optional
+import os
+import threading
+import httpx
+import openai
+
+# One client per process keeps connections (and their TLS sessions) alive
+# across calls instead of opening a new pool for every completion.
+_client: Optional[openai.OpenAI] = None
+_async_client: Optional[openai.AsyncOpenAI] = None
+_lock = threading.Lock()
+
+def _http2_enabled() -> bool:
+    """HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 without it"""
+    if os.getenv('LLM_HTTP2', 'true').lower() == 'false':
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _http_options() -> dict:
+    return {
+        'http2': _http2_enabled(),
+        'limits': httpx.Limits(
+            max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '100')),
+            max_keepalive_connections=int(os.getenv('LLM_MAX_KEEPALIVE', '20')),
+            keepalive_expiry=float(os.getenv('LLM_KEEPALIVE_SECONDS', '60'))
+        ),
+        'timeout': httpx.Timeout(float(os.getenv('LLM_TIMEOUT_SECONDS', '60')), connect=5.0)
+    }
+
+def _client_options() -> dict:
+    # base_url lets tests and local deployments point at a stub or proxy
+    return {
+        'api_key': os.getenv('OPENAI_API_KEY'),
+        'base_url': os.getenv('OPENAI_BASE_URL') or None,
+        'max_retries': int(os.getenv('LLM_MAX_RETRIES', '2'))
+    }
+
+def get_openai_client() -> openai.OpenAI:
+    """The process-wide synchronous client, created on first use"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = openai.OpenAI(http_client=httpx.Client(**_http_options()),
+                                        **_client_options())
+    return _client
+
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """The process-wide asyncio client, created on first use"""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = openai.AsyncOpenAI(
+                    http_client=httpx.AsyncClient(**_http_options()), **_client_options())
+    return _async_client
+
+def set_openai_client(client: Optional[openai.OpenAI] = None,
+                      async_client: Optional[openai.AsyncOpenAI] = None):
+    """Replace the shared clients, e.g. with ones pointed at a stub server.
+
+    Passing None for either resets it, so the next call builds a fresh one
+    from the environment.
+    """
+    global _client, _async_client
+    with _lock:
+        _client = client
+        _async_client = async_client
@@ -1,10 +1,17 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from typing import List, Optional
 from pydantic import BaseModel
+import asyncio
+import json
+import os
+import threading
 import uvicorn
-from app.bot import process_message, add_company_knowledge
+from app.bot import (process_message_async, stream_message_async, add_company_knowledge,
+                     delete_company_documents, warm_up, skip_warm_up, get_readiness)
 from app.processor import process_document
 
 app = FastAPI(title="Simple Company Chatbot")
@@ -18,6 +25,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def start_warm_up():
+    """Load the model and hot tenants in the background so the port binds immediately"""
+    if os.getenv('WARM_UP_ON_START', 'true').lower() == 'false':
+        skip_warm_up()  # Otherwise /ready would wait for a warm-up that never runs
+        return
+    retry_seconds = float(os.getenv('WARM_UP_RETRY_SECONDS', '30'))
+    threading.Thread(target=warm_up, kwargs={'retry_seconds': retry_seconds},
+                     name='warm-up', daemon=True).start()
+
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: the model and warm tenants are loaded"""
+    readiness = get_readiness()
+    if not readiness['ready']:
+        return JSONResponse(status_code=503, content=readiness)
+    return readiness
+
 # Models for request/response
 class ChatMessage(BaseModel):
     message: str
@@ -30,8 +60,12 @@ class ChatResponse(BaseModel):
     source: str
 
 @app.post("/setup/{company_id}")
-async def setup_company(company_id: str, files: List[UploadFile]):
-    """Setup endpoint for companies to upload their documents"""
+async def setup_company(company_id: str, files: List[UploadFile], replace: bool = False):
+    """Setup endpoint for companies to upload their documents.
+
+    Uploads are added to the existing knowledge; a file with the same name
+    replaces its previous version. Pass ``replace=true`` to start over.
+    """
     try:
         texts = []
         sources = []
@@ -40,11 +74,14 @@ async def setup_company(company_id: str, files: List[UploadFile]):
         for file in files:
             print(f"Processing file: {file.filename}")
             content = await file.read()
-            text, source = process_document(content, file.filename, file.content_type)
+            text, source = await run_in_threadpool(process_document, content, file.filename,
+                                                   file.content_type)
             texts.append(text)
             sources.append(source)
         
-        success = add_company_knowledge(company_id, texts, sources)
+        # Parsing and embedding run off the event loop so chats keep flowing
+        success = await run_in_threadpool(add_company_knowledge, company_id, texts, sources,
+                                          replace)
         if success:
             return {"status": "success", "message": f"Setup complete for company {company_id}"}
         else:
@@ -54,21 +91,70 @@ async def setup_company(company_id: str, files: List[UploadFile]):
         print(f"Setup error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.delete("/setup/{company_id}/documents")
+async def delete_documents(company_id: str, source: List[str] = Query(...)):
+    """Remove documents (by source) from a company's knowledge"""
+    try:
+        deleted = await run_in_threadpool(delete_company_documents, company_id, source)
+        return {"status": "success", "deleted_chunks": deleted}
+    except Exception as e:
+        print(f"Delete error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+class ClientDisconnected(Exception):
+    pass
+
+async def run_until_disconnected(request: Request, coroutine, poll_seconds: float = 0.25):
+    """Await a coroutine, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(coroutine)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        task.cancel()  # No-op once the task has finished
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(chat: ChatMessage):
-    """Chat endpoint that handles user messages"""
+async def chat_endpoint(chat: ChatMessage, request: Request):
+    """Chat endpoint that handles user messages.
+
+    The pipeline never blocks the event loop, so one worker serves many
+    chats concurrently; a chat whose client disconnects is cancelled.
+    """
     try:
-        response, confidence, context, source = process_message(chat.company_id, chat.message)
+        response, confidence, context, source = await run_until_disconnected(
+            request, process_message_async(chat.company_id, chat.message))
         return ChatResponse(
             response=response,
             confidence=confidence,
             context=context,
             source=source
         )
+    except ClientDisconnected:
+        return Response(status_code=499)  # Client closed request; nobody reads this
     except Exception as e:
         print(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(chat: ChatMessage):
+    """Streaming chat as server-sent events.
+
+    Sends a ``metadata`` event (source, confidence, context) once retrieval
+    finishes, a ``token`` event per piece of the answer as the LLM
+    generates it, and a final ``done`` (or ``error``) event. Closing the
+    connection stops generation.
+    """
+    async def events():
+        async for event in stream_message_async(chat.company_id, chat.message):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/analytics/{company_id}")
 async def get_analytics(company_id: str):
     """Get chat analytics for a company"""
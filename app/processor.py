@@ -1,4 +1,5 @@
 from typing import List, Dict, Union, Tuple
+import hashlib
 import PyPDF2
 from docx import Document
 import pandas as pd
@@ -6,6 +7,7 @@ from io import BytesIO
 import requests
 from bs4 import BeautifulSoup
 import json
+from .store import get_parsed_text, save_parsed_text
 
 class DocumentProcessor:
     def __init__(self):
@@ -25,6 +27,13 @@ class DocumentProcessor:
         if file_extension not in self.supported_types:
             raise ValueError(f"Unsupported file type: {file_extension}")
         
+        # Extracted text is kept on disk by content hash, so re-uploading a
+        # byte-identical file skips parsing, across restarts and workers
+        cache_key = f"{file_extension[1:]}-{hashlib.sha256(file_content).hexdigest()}"
+        processed_text = get_parsed_text(cache_key)
+        if processed_text is not None:
+            return processed_text, f"{self.supported_types[file_extension]}: {filename}"
+
         try:
             processed_text = ""
             if file_extension == '.pdf':
@@ -39,6 +48,7 @@ class DocumentProcessor:
                 processed_text = self._process_html(file_content)
             elif file_extension == '.json':
                 processed_text = self._process_json(file_content)
+            save_parsed_text(cache_key, processed_text)
 
             # Create source information
             doc_type = self.supported_types[file_extension]
@@ -0,0 +1,70 @@
+from typing import Dict, Optional
+import numpy as np
+from .ann import normalize_rows
+
+QUANTIZATION_KINDS = ('float16', 'int8')
+
+class QuantizedEmbeddings:
+    """Pre-normalized embeddings stored as float16 or int8 codes.
+
+    Rows are L2-normalized before quantization, so cosine similarity is a
+    plain dot product. int8 keeps one float32 scale per row
+    (``row ~= codes * scale``), which costs 4 bytes per row on top of
+    1 byte per dimension. Scans run in blocks so the temporary float32 copy
+    never exceeds ``block_rows`` rows.
+    """
+
+    def __init__(self, kind: str, codes: np.ndarray, scales: Optional[np.ndarray] = None,
+                 block_rows: int = 16384):
+        if kind not in QUANTIZATION_KINDS:
+            raise ValueError(f"Unknown quantization: {kind}")
+        self.kind = kind
+        self.codes = codes
+        self.scales = scales
+        self.block_rows = block_rows
+
+    @classmethod
+    def quantize(cls, embeddings: np.ndarray, kind: str,
+                 block_rows: int = 16384) -> 'QuantizedEmbeddings':
+        """Normalize and quantize a float embedding matrix, one block at a time"""
+        if kind not in QUANTIZATION_KINDS:
+            raise ValueError(f"Unknown quantization: {kind}")
+        codes = np.empty(embeddings.shape, dtype=np.float16 if kind == 'float16' else np.int8)
+        scales = np.empty((len(embeddings), 1), dtype=np.float32) if kind == 'int8' else None
+
+        for start in range(0, len(embeddings), block_rows):
+            unit = normalize_rows(embeddings[start:start + block_rows])
+            if kind == 'float16':
+                codes[start:start + block_rows] = unit
+                continue
+            block_scales = np.abs(unit).max(axis=1, keepdims=True) / 127
+            block_scales[block_scales == 0] = 1
+            codes[start:start + block_rows] = np.clip(np.rint(unit / block_scales), -127, 127)
+            scales[start:start + block_rows] = block_scales
+        return cls(kind, codes, scales, block_rows)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def similarities(self, query: np.ndarray) -> np.ndarray:
+        """Approximate cosine similarity of the query to every row"""
+        query = normalize_rows(query.reshape(1, -1))[0]
+        out = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), self.block_rows):
+            stop = start + self.block_rows
+            block = np.asarray(self.codes[start:stop], dtype=np.float32) @ query
+            if self.scales is not None:
+                block *= np.asarray(self.scales[start:stop, 0])
+            out[start:stop] = block
+        return out
+
+    def to_state(self) -> Dict:
+        return {'kind': self.kind, 'codes': self.codes, 'scales': self.scales}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'QuantizedEmbeddings':
+        return cls(state['kind'], state['codes'], state.get('scales'))
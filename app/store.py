@@ -1,9 +1,89 @@
-from typing import Dict, List, Any, Optional
+from typing import IO, Callable, Dict, Iterator, List, Any, Optional
+from contextlib import contextmanager
+import fcntl
 import json
 import os
 from datetime import datetime
 import pickle
+import struct
+import tempfile
+import threading
 from pathlib import Path
+import numpy as np
+
+# Binary embedding file layout (little-endian):
+#   magic (8 bytes) | version (u16) | dtype code (u16) | rows (u64) | cols (u64)
+# padded to EMBEDDING_HEADER_SIZE, followed by the raw row-major matrix.
+EMBEDDING_MAGIC = b'CTXEMB\x00\x00'
+EMBEDDING_FORMAT_VERSION = 1
+EMBEDDING_HEADER_SIZE = 64
+EMBEDDING_DTYPES = {1: np.float32, 2: np.float16, 3: np.int8}
+_EMBEDDING_HEADER = struct.Struct('<8sHHQQ')
+
+def _write_atomically(path: Path, write: Callable[[IO], None], mode: str = 'wb') -> None:
+    """Write through a temp file and rename it over ``path``.
+
+    Readers never see a half-written file, and every writer gets its own
+    temp file, so concurrent writers (threads or processes) cannot
+    interleave; the last rename wins.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+def write_embedding_file(path: Path, embeddings: np.ndarray, dtype: str = 'float32') -> None:
+    """Write embeddings as a versioned header plus a raw matrix"""
+    matrix = np.ascontiguousarray(embeddings, dtype=np.dtype(dtype))
+    if matrix.ndim != 2:
+        raise ValueError(f"Embeddings must be a 2-D matrix, got shape {matrix.shape}")
+    codes = {np.dtype(v): k for k, v in EMBEDDING_DTYPES.items()}
+    if matrix.dtype not in codes:
+        raise ValueError(f"Unsupported embedding dtype: {matrix.dtype}")
+
+    header = _EMBEDDING_HEADER.pack(EMBEDDING_MAGIC, EMBEDDING_FORMAT_VERSION,
+                                    codes[matrix.dtype], matrix.shape[0], matrix.shape[1])
+
+    def write(f):
+        f.write(header.ljust(EMBEDDING_HEADER_SIZE, b'\x00'))
+        matrix.tofile(f)
+
+    # Readers never map a half-written file
+    _write_atomically(path, write)
+
+def open_embedding_file(path: Path) -> np.ndarray:
+    """Open an embedding file as a read-only memory map (zero-copy)"""
+    with open(path, 'rb') as f:
+        header = f.read(EMBEDDING_HEADER_SIZE)
+    if len(header) < _EMBEDDING_HEADER.size:
+        raise ValueError(f"Truncated embedding file: {path}")
+
+    magic, version, dtype_code, rows, cols = _EMBEDDING_HEADER.unpack_from(header)
+    if magic != EMBEDDING_MAGIC:
+        raise ValueError(f"Not an embedding file: {path}")
+    if version > EMBEDDING_FORMAT_VERSION:
+        raise ValueError(f"Unsupported embedding format version {version}: {path}")
+    if dtype_code not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unknown embedding dtype code {dtype_code}: {path}")
+
+    dtype = EMBEDDING_DTYPES[dtype_code]
+    if rows == 0:
+        return np.zeros((0, cols), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r',
+                     offset=EMBEDDING_HEADER_SIZE, shape=(rows, cols))
+
+def _save_array(path: Path, array: np.ndarray) -> None:
+    """Save an array as .npy via a temp file so it can be opened with mmap_mode"""
+    _write_atomically(path, lambda f: np.save(f, np.ascontiguousarray(array)))
+
+def _save_json(path: Path, obj) -> None:
+    """Write JSON via a temp file so readers never see a half-written document"""
+    _write_atomically(path, lambda f: json.dump(obj, f), mode='w')
 
 class DataStore:
     def __init__(self):
@@ -12,12 +92,19 @@ class DataStore:
         self.companies_dir = self.base_dir / "companies"
         self.embeddings_dir = self.base_dir / "embeddings"
         self.chats_dir = self.base_dir / "chats"
+        self.indexes_dir = self.base_dir / "indexes"
+        self.segments_dir = self.base_dir / "segments"
+        self.parsed_dir = self.base_dir / "parsed"
         
         # Create directories
         for directory in [self.base_dir, self.companies_dir, 
-                         self.embeddings_dir, self.chats_dir]:
+                         self.embeddings_dir, self.chats_dir,
+                         self.indexes_dir, self.segments_dir, self.parsed_dir]:
             directory.mkdir(exist_ok=True)
             
+        # On-disk precision for embeddings ('float32' or 'float16')
+        self.embedding_dtype = os.getenv('EMBEDDING_DTYPE', 'float32')
+            
         # In-memory cache
         self._cache = {}
 
@@ -26,22 +113,36 @@ class DataStore:
         try:
             # Save basic company info as JSON
             company_file = self.companies_dir / f"{company_id}.json"
-            with open(company_file, 'w') as f:
-                json.dump({
-                    'company_id': company_id,
-                    'updated_at': datetime.now().isoformat(),
-                    'documents': data.get('documents', []),
-                    'config': data.get('config', {})
-                }, f)
-
-            # Save embeddings as pickle (more efficient for numpy arrays)
+            updated_at = datetime.now().isoformat()
+            _save_json(company_file, {
+                'company_id': company_id,
+                'updated_at': updated_at,
+                'documents': data.get('documents', []),
+                'config': data.get('config', {}),
+                'segments': data.get('segments', []),
+                'next_chunk_id': data.get('next_chunk_id', 0),
+                'last_updated': data.get('last_updated'),
+                'revision': data.get('revision')
+            })
+
+            # Save embeddings in the binary format so they can be memory-mapped
             if 'embeddings' in data:
-                emb_file = self.embeddings_dir / f"{company_id}.pkl"
-                with open(emb_file, 'wb') as f:
-                    pickle.dump(data['embeddings'], f)
+                emb_file = self.embeddings_dir / f"{company_id}.emb"
+                write_embedding_file(emb_file, data['embeddings'], self.embedding_dtype)
+
+                # Drop any legacy pickle so it is never preferred over fresh data
+                legacy_file = self.embeddings_dir / f"{company_id}.pkl"
+                if legacy_file.exists():
+                    legacy_file.unlink()
+
+            # Save lexical index statistics so BM25 can be restored without re-tokenizing
+            if 'lexical' in data:
+                lex_file = self.indexes_dir / f"{company_id}.pkl"
+                with open(lex_file, 'wb') as f:
+                    pickle.dump(data['lexical'], f)
 
             # Update cache
-            self._cache[f"company_{company_id}"] = data
+            self._cache[f"company_{company_id}"] = {**data, 'updated_at': updated_at}
             
             return True
         except Exception as e:
@@ -65,11 +166,18 @@ class DataStore:
             with open(company_file, 'r') as f:
                 data = json.load(f)
             
-            # Load embeddings if they exist
-            emb_file = self.embeddings_dir / f"{company_id}.pkl"
-            if emb_file.exists():
-                with open(emb_file, 'rb') as f:
-                    data['embeddings'] = pickle.load(f)
+            # Only a manifest without segments still uses the single-file index
+            if 'segments' not in data:
+                # Load embeddings if they exist
+                embeddings = self._load_embeddings(company_id)
+                if embeddings is not None:
+                    data['embeddings'] = embeddings
+
+                # Load lexical index statistics if they exist
+                lex_file = self.indexes_dir / f"{company_id}.pkl"
+                if lex_file.exists():
+                    with open(lex_file, 'rb') as f:
+                        data['lexical'] = pickle.load(f)
             
             # Update cache
             self._cache[cache_key] = data
@@ -79,6 +187,205 @@ class DataStore:
             print(f"Error loading company data: {str(e)}")
             return None
 
+    def get_company_revision(self, company_id: str) -> Optional[str]:
+        """Revision of the manifest on disk, read past the cache.
+
+        Other processes sharing the data directory may have rewritten it
+        since this one cached it.
+        """
+        company_file = self.companies_dir / f"{company_id}.json"
+        if not company_file.exists():
+            return None
+        with open(company_file, 'r') as f:
+            return json.load(f).get('revision')
+
+    @contextmanager
+    def company_lock(self, company_id: str) -> Iterator[None]:
+        """Exclusive lock on a company's manifest, across threads and processes.
+
+        Not reentrant: a thread holding it must not take it again.
+        """
+        with open(self.companies_dir / f"{company_id}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_embeddings(self, company_id: str) -> Optional[np.ndarray]:
+        """Memory-map a company's embeddings, migrating legacy pickles on first read"""
+        emb_file = self.embeddings_dir / f"{company_id}.emb"
+        legacy_file = self.embeddings_dir / f"{company_id}.pkl"
+
+        if not emb_file.exists() and legacy_file.exists():
+            with open(legacy_file, 'rb') as f:
+                embeddings = np.asarray(pickle.load(f))
+            write_embedding_file(emb_file, embeddings, self.embedding_dtype)
+            legacy_file.unlink()
+            print(f"Migrated embeddings for {company_id} to binary format")
+
+        if not emb_file.exists():
+            return None
+        return open_embedding_file(emb_file)
+
+    def delete_legacy_index(self, company_id: str) -> bool:
+        """Remove a single-file index once it has been migrated to segments"""
+        try:
+            for legacy_file in (self.embeddings_dir / f"{company_id}.emb",
+                                self.embeddings_dir / f"{company_id}.pkl",
+                                self.indexes_dir / f"{company_id}.pkl"):
+                if legacy_file.exists():
+                    legacy_file.unlink()
+            return True
+        except Exception as e:
+            print(f"Error deleting legacy index of {company_id}: {str(e)}")
+            return False
+
+    def save_segment(self, company_id: str, segment_id: str, data: Dict) -> bool:
+        """Save one immutable index segment (chunk arena, embeddings, lexical stats)"""
+        try:
+            segment_dir = self.segments_dir / company_id
+            segment_dir.mkdir(exist_ok=True)
+
+            # Chunk texts and source ids are raw arrays so they can be memory-mapped
+            chunks = data['chunks']
+            for name in ('buffer', 'offsets', 'source_ids'):
+                _save_array(segment_dir / f"{segment_id}.{name}.npy", chunks[name])
+
+            _save_json(segment_dir / f"{segment_id}.json", {
+                'segment_id': segment_id,
+                'chunk_ids': data['chunk_ids'],
+                'source_table': chunks['source_table'],
+                'duplicate_sources': data.get('duplicate_sources', {}),
+                # Chunk content hashes as one hex string (16 bytes per chunk)
+                'hashes': data['hashes'].tobytes().hex() if data.get('hashes') is not None else None
+            })
+
+            write_embedding_file(segment_dir / f"{segment_id}.emb",
+                                 data['embeddings'], self.embedding_dtype)
+
+            with open(segment_dir / f"{segment_id}.pkl", 'wb') as f:
+                pickle.dump(data['lexical'], f)
+
+            # ANN index is optional (small segments are scanned exactly)
+            if data.get('ann') is not None:
+                with open(segment_dir / f"{segment_id}.ann", 'wb') as f:
+                    pickle.dump(data['ann'], f)
+
+            # Quantized codes (and int8 row scales) are memory-mapped like embeddings
+            quantized = data.get('quantized')
+            if quantized is not None:
+                write_embedding_file(segment_dir / f"{segment_id}.qemb", quantized['codes'],
+                                     quantized['codes'].dtype.name)
+                if quantized.get('scales') is not None:
+                    write_embedding_file(segment_dir / f"{segment_id}.qscale", quantized['scales'])
+
+            return True
+        except Exception as e:
+            print(f"Error saving segment {segment_id}: {str(e)}")
+            return False
+
+    def get_segment(self, company_id: str, segment_id: str) -> Optional[Dict]:
+        """Load one index segment; embeddings and chunk texts are memory-mapped"""
+        try:
+            segment_dir = self.segments_dir / company_id
+            segment_file = segment_dir / f"{segment_id}.json"
+            if not segment_file.exists():
+                return None
+
+            with open(segment_file, 'r') as f:
+                data = json.load(f)
+
+            # Segments written before the chunk arena keep plain 'texts'/'sources' lists
+            if 'source_table' in data:
+                data['chunks'] = {
+                    name: np.load(segment_dir / f"{segment_id}.{name}.npy", mmap_mode='r')
+                    for name in ('buffer', 'offsets', 'source_ids')
+                }
+                data['chunks']['source_table'] = data.pop('source_table')
+
+            if data.get('hashes') is not None:
+                data['hashes'] = np.frombuffer(bytes.fromhex(data['hashes']), dtype='S16')
+            data['embeddings'] = open_embedding_file(segment_dir / f"{segment_id}.emb")
+            with open(segment_dir / f"{segment_id}.pkl", 'rb') as f:
+                data['lexical'] = pickle.load(f)
+
+            ann_file = segment_dir / f"{segment_id}.ann"
+            if ann_file.exists():
+                with open(ann_file, 'rb') as f:
+                    data['ann'] = pickle.load(f)
+
+            quantized = self.get_segment_quantized(company_id, segment_id)
+            if quantized is not None:
+                data['quantized'] = quantized
+
+            return data
+        except Exception as e:
+            print(f"Error loading segment {segment_id}: {str(e)}")
+            return None
+
+    def get_segment_embeddings(self, company_id: str, segment_id: str) -> Optional[np.ndarray]:
+        """Memory-map just the embeddings of a saved segment"""
+        emb_file = self.segments_dir / company_id / f"{segment_id}.emb"
+        if not emb_file.exists():
+            return None
+        return open_embedding_file(emb_file)
+
+    def get_segment_quantized(self, company_id: str, segment_id: str) -> Optional[Dict]:
+        """Memory-map the quantized embeddings of a saved segment, if it has them"""
+        segment_dir = self.segments_dir / company_id
+        codes_file = segment_dir / f"{segment_id}.qemb"
+        if not codes_file.exists():
+            return None
+        codes = open_embedding_file(codes_file)
+        scales_file = segment_dir / f"{segment_id}.qscale"
+        return {
+            'kind': codes.dtype.name,
+            'codes': codes,
+            'scales': open_embedding_file(scales_file) if scales_file.exists() else None
+        }
+
+    def create_scratch_matrix(self, rows: int, cols: int) -> np.ndarray:
+        """Writable float32 matrix backed by an anonymous file under the data dir.
+
+        Used to stage large ingest batches on disk instead of in RAM; the
+        file disappears once the matrix is garbage collected.
+        """
+        return np.memmap(tempfile.TemporaryFile(dir=self.base_dir), dtype=np.float32,
+                         mode='w+', shape=(rows, cols))
+
+    def delete_segment(self, company_id: str, segment_id: str) -> bool:
+        """Remove a segment's files after it has been merged away"""
+        try:
+            segment_dir = self.segments_dir / company_id
+            for suffix in ('.json', '.emb', '.pkl', '.ann', '.qemb', '.qscale',
+                           '.buffer.npy', '.offsets.npy', '.source_ids.npy'):
+                segment_file = segment_dir / f"{segment_id}{suffix}"
+                if segment_file.exists():
+                    segment_file.unlink()
+            return True
+        except Exception as e:
+            print(f"Error deleting segment {segment_id}: {str(e)}")
+            return False
+
+    def get_parsed_text(self, content_key: str) -> Optional[str]:
+        """Text previously extracted from a file with this content hash, or None"""
+        parsed_file = self.parsed_dir / f"{content_key}.txt"
+        try:
+            return parsed_file.read_bytes().decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def save_parsed_text(self, content_key: str, text: str) -> bool:
+        """Remember the text extracted from a file, shared by all workers"""
+        try:
+            _write_atomically(self.parsed_dir / f"{content_key}.txt",
+                              lambda f: f.write(text.encode('utf-8')))
+            return True
+        except Exception as e:
+            print(f"Error saving parsed text: {str(e)}")
+            return False
+
     def save_chat(self, company_id: str, chat_data: Dict) -> bool:
         """Save chat interaction"""
         try:
@@ -115,22 +422,78 @@ class DataStore:
             print(f"Error loading chats: {str(e)}")
             return []
 
+    def evict_company(self, company_id: str):
+        """Drop a company's cached record; it is re-read from disk on next access"""
+        self._cache.pop(f"company_{company_id}", None)
+
     def clear_cache(self):
         """Clear the in-memory cache"""
         self._cache = {}
 
-# Create singleton instance
-store = DataStore()
+# Singleton instance, created (with its directories) on first use rather
+# than at import
+_store: Optional[DataStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> DataStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DataStore()
+    return _store
+
+def __getattr__(name: str):
+    # Keeps ``from app.store import store`` working
+    if name == 'store':
+        return get_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Export functions for easier access
 def save_data(company_id: str, data: Dict) -> bool:
-    return store.save_company_data(company_id, data)
+    return get_store().save_company_data(company_id, data)
 
 def get_data(company_id: str) -> Optional[Dict]:
-    return store.get_company_data(company_id)
+    return get_store().get_company_data(company_id)
+
+def evict_data(company_id: str):
+    get_store().evict_company(company_id)
+
+def get_company_revision(company_id: str) -> Optional[str]:
+    return get_store().get_company_revision(company_id)
+
+def company_lock(company_id: str):
+    return get_store().company_lock(company_id)
+
+def delete_legacy_index(company_id: str) -> bool:
+    return get_store().delete_legacy_index(company_id)
+
+def save_segment(company_id: str, segment_id: str, data: Dict) -> bool:
+    return get_store().save_segment(company_id, segment_id, data)
+
+def get_segment(company_id: str, segment_id: str) -> Optional[Dict]:
+    return get_store().get_segment(company_id, segment_id)
+
+def get_segment_embeddings(company_id: str, segment_id: str) -> Optional[np.ndarray]:
+    return get_store().get_segment_embeddings(company_id, segment_id)
+
+def get_segment_quantized(company_id: str, segment_id: str) -> Optional[Dict]:
+    return get_store().get_segment_quantized(company_id, segment_id)
+
+def create_scratch_matrix(rows: int, cols: int) -> np.ndarray:
+    return get_store().create_scratch_matrix(rows, cols)
+
+def delete_segment(company_id: str, segment_id: str) -> bool:
+    return get_store().delete_segment(company_id, segment_id)
+
+def get_parsed_text(content_key: str) -> Optional[str]:
+    return get_store().get_parsed_text(content_key)
+
+def save_parsed_text(content_key: str, text: str) -> bool:
+    return get_store().save_parsed_text(content_key, text)
 
 def save_chat_interaction(company_id: str, chat_data: Dict) -> bool:
-    return store.save_chat(company_id, chat_data)
+    return get_store().save_chat(company_id, chat_data)
 
 def get_chat_history(company_id: str, limit: int = 100) -> List[Dict]:
-    return store.get_chats(company_id, limit)
\ No newline at end of file
+    return get_store().get_chats(company_id, limit)
\ No newline at end of file
@@ -0,0 +1,143 @@
+from typing import Callable, Dict, List, Optional
+from collections import OrderedDict
+import threading
+import time
+from .index import CompanyIndex
+
+class TenantIndexCache:
+    """Byte-budgeted LRU of resident company indexes.
+
+    Every company is persisted as soon as it changes, so evicting one only
+    drops it from memory; the next query reloads it from the DataStore.
+    Sizes are taken from ``CompanyIndex.nbytes`` when an index is put, so
+    callers put it again after it grows. The most recently used company and
+    companies with a merge in progress are never evicted.
+    """
+
+    def __init__(self, max_bytes: int = 2 * 1024 * 1024 * 1024,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict  # called with the company id after eviction
+        self._entries: 'OrderedDict[str, CompanyIndex]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Per-company load lock and the number of threads holding or awaiting it
+        self._load_locks: Dict[str, list] = {}
+
+        # Counters for monitoring
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.max_load_seconds = 0.0
+
+    def __contains__(self, company_id: str) -> bool:
+        with self._lock:
+            return company_id in self._entries
+
+    def get(self, company_id: str) -> Optional[CompanyIndex]:
+        """Return a resident index and mark it recently used, or None"""
+        with self._lock:
+            company = self._entries.get(company_id)
+            if company is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(company_id)
+            self.hits += 1
+            return company
+
+    def get_or_load(self, company_id: str,
+                    loader: Callable[[str], Optional[CompanyIndex]]) -> Optional[CompanyIndex]:
+        """Return a resident index, or load it with ``loader`` and record the load time"""
+        company = self.get(company_id)
+        if company is not None:
+            return company
+
+        # Loads of different companies run in parallel; concurrent misses on
+        # the same company wait for the first loader
+        with self._lock:
+            entry = self._load_locks.setdefault(company_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                with self._lock:
+                    company = self._entries.get(company_id)
+                if company is None:
+                    start = time.perf_counter()
+                    company = loader(company_id)
+                    if company is not None:
+                        self.put(company_id, company, load_seconds=time.perf_counter() - start)
+                return company
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._load_locks[company_id]
+
+    def put(self, company_id: str, company: CompanyIndex,
+            load_seconds: Optional[float] = None):
+        """Add or re-account an index, evicting others to stay within budget.
+
+        ``load_seconds`` records how long loading it from disk took.
+        """
+        size = company.nbytes
+        with self._lock:
+            self._bytes += size - self._sizes.get(company_id, 0)
+            self._sizes[company_id] = size
+            self._entries[company_id] = company
+            self._entries.move_to_end(company_id)
+            if load_seconds is not None:
+                self.loads += 1
+                self.load_seconds += load_seconds
+                self.max_load_seconds = max(self.max_load_seconds, load_seconds)
+            evicted = self._evict()
+
+        if self.on_evict is not None:
+            for evicted_id in evicted:
+                self.on_evict(evicted_id)
+
+    def pop(self, company_id: str) -> Optional[CompanyIndex]:
+        """Drop an index from memory without counting an eviction"""
+        with self._lock:
+            self._bytes -= self._sizes.pop(company_id, 0)
+            return self._entries.pop(company_id, None)
+
+    def clear(self):
+        """Drop all indexes (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def _evict(self) -> List[str]:
+        """Evict least-recently-used indexes until within budget (lock held)"""
+        evicted = []
+        for company_id in list(self._entries)[:-1]:
+            if self._bytes <= self.max_bytes:
+                break
+            if self._entries[company_id].merging:
+                continue
+            del self._entries[company_id]
+            self._bytes -= self._sizes.pop(company_id)
+            self.evictions += 1
+            evicted.append(company_id)
+        return evicted
+
+    def stats(self) -> Dict:
+        """Residency, eviction and reload latency counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "tenants": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "loads": self.loads,
+                "avg_load_ms": self.load_seconds * 1000 / self.loads if self.loads else 0.0,
+                "max_load_ms": self.max_load_seconds * 1000
+            }
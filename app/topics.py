@@ -0,0 +1,82 @@
+from typing import Callable, Dict, List, Tuple
+import queue
+import threading
+from .batching import collect_batch
+
+class TopicLabeler:
+    """Labels interaction topics in the background, several per LLM call.
+
+    ``submit`` returns immediately; a worker thread collects interactions
+    for up to ``max_wait_ms`` after the first one arrives, or until
+    ``max_batch_size`` are queued, labels them with one ``label_batch``
+    call and hands each topic to its interaction's callback. If labelling
+    fails, every interaction in the batch gets ``fallback(query)``.
+    """
+
+    def __init__(self, label_batch: Callable[[List[Tuple[str, str]]], List[str]],
+                 fallback: Callable[[str], str], max_batch_size: int = 8,
+                 max_wait_ms: float = 1000.0):
+        self.label_batch = label_batch
+        self.fallback = fallback
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: 'queue.Queue[Tuple[str, str, Callable[[str], None]]]' = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # Counters for monitoring
+        self.batches = 0
+        self.labelled = 0
+        self.failures = 0
+
+    def submit(self, query: str, context: str, callback: Callable[[str], None]):
+        """Queue an interaction; ``callback(topic)`` runs on the worker thread"""
+        self._ensure_worker()
+        self._queue.put((query, context, callback))
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use"""
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='topic-labeler',
+                                                    daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        # Nothing may end this thread: later topics would never be labelled
+        while True:
+            try:
+                self._label(collect_batch(self._queue, self.max_batch_size, self.max_wait_ms))
+            except Exception as e:
+                print(f"Topic labeler error: {str(e)}")
+
+    def _label(self, batch: List[Tuple[str, str, Callable[[str], None]]]):
+        try:
+            topics = self.label_batch([(query, context) for query, context, _ in batch])
+            failed = False
+        except Exception:
+            topics = [self.fallback(query) for query, _, _ in batch]
+            failed = True
+
+        with self._stats_lock:
+            self.batches += 1
+            self.labelled += len(batch)
+            self.failures += failed
+        for (_, _, callback), topic in zip(batch, topics):
+            try:
+                callback(topic)
+            except Exception as e:
+                print(f"Topic callback error: {str(e)}")
+
+    def stats(self) -> Dict:
+        """Queue depth and batching counters"""
+        with self._stats_lock:
+            return {
+                "pending": self._queue.qsize(),
+                "batches": self.batches,
+                "labelled": self.labelled,
+                "failed_batches": self.failures,
+                "average_batch_size": self.labelled / self.batches if self.batches else 0.0
+            }
@@ -0,0 +1,78 @@
+"""Compare the IVF-flat ANN index with an exhaustive cosine scan.
+
+Reports build time, recall@k and per-query latency for a range of
+``n_probe`` values and for the index's default. Uses a synthetic clustered
+corpus by default, or a company's stored embeddings with
+``--embeddings data/segments/<id>/<seg>.emb``.
+
+    python benchmarks/ann_benchmark.py --rows 200000 --k 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.ann import IVFFlatIndex, semantic_similarities
+from app.store import open_embedding_file
+
+def make_corpus(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Gaussian mixture, which is roughly how sentence embeddings cluster by topic"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    return centers[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+
+def top_k(similarities: np.ndarray, k: int) -> np.ndarray:
+    return np.argpartition(-similarities, k - 1)[:k]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--clusters', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--n-lists', type=int, default=None)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--embeddings', type=Path, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed + 1)
+    if args.embeddings:
+        embeddings = open_embedding_file(args.embeddings)
+    else:
+        embeddings = make_corpus(args.rows, args.dim, args.clusters, args.seed)
+
+    # Queries are noisy copies of corpus rows, like paraphrased questions
+    picks = rng.integers(0, len(embeddings), args.queries)
+    queries = np.asarray(embeddings[picks], dtype=np.float32)
+    queries += 0.3 * queries.std() * rng.standard_normal(queries.shape).astype(np.float32)
+
+    start = time.perf_counter()
+    ann = IVFFlatIndex.build(embeddings, n_lists=args.n_lists)
+    build_seconds = time.perf_counter() - start
+    print(f"corpus: {len(embeddings)} x {embeddings.shape[1]}, "
+          f"lists: {ann.n_lists}, build: {build_seconds:.2f}s")
+
+    start = time.perf_counter()
+    truth = [set(top_k(semantic_similarities(embeddings, q), args.k)) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"{'mode':>12} {'recall@' + str(args.k):>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'exact':>12} {1.0:>10.3f} {exact_ms:>10.2f} {1.0:>8.1f}")
+
+    for n_probe in args.n_probe + [None]:
+        hits = 0
+        start = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            found = top_k(semantic_similarities(embeddings, query, ann, n_probe), args.k)
+            hits += len(expected & set(found))
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = hits / (args.k * len(queries))
+        mode = f"nprobe={n_probe}" if n_probe is not None else f"default={ann.default_n_probe}"
+        print(f"{mode:>12} {recall:>10.3f} {ms:>10.2f} {exact_ms / ms:>8.1f}")
+
+if __name__ == '__main__':
+    main()
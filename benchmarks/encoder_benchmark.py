@@ -0,0 +1,91 @@
+"""Compare embedding backends for speed and parity with stock PyTorch.
+
+For every backend, reports ingest throughput (sentences/sec when encoding
+the corpus in batches), single-query latency, and the cosine similarity of
+its embeddings to the float32 PyTorch reference. Exits non-zero if any
+backend's minimum cosine falls below ``--min-cosine``, so it doubles as a
+parity check before switching ``EMBEDDING_BACKEND``. Uses generated
+sentences by default, or one sentence per line of ``--corpus``.
+
+    python benchmarks/encoder_benchmark.py --backends torch torch-int8 onnx onnx-int8 --threads 4
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.encoders import ENCODER_BACKENDS, create_encoder
+
+WORDS = ("refund order shipping account password invoice warranty delivery return policy "
+         "customer support payment subscription plan upgrade cancel billing address product "
+         "price discount store hours contact email phone days business within after before").split()
+
+def make_corpus(sentences: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return [' '.join(rng.choice(WORDS, rng.integers(6, 40))) for _ in range(sentences)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--backends', nargs='+', choices=ENCODER_BACKENDS,
+                        default=list(ENCODER_BACKENDS))
+    parser.add_argument('--sentences', type=int, default=2000)
+    parser.add_argument('--corpus', type=Path, default=None)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--interop-threads', type=int, default=None)
+    parser.add_argument('--min-cosine', type=float, default=0.98)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = [line.strip() for line in args.corpus.read_text().splitlines() if line.strip()]
+    else:
+        corpus = make_corpus(args.sentences, args.seed)
+    queries = corpus[:args.queries]
+
+    reference = None
+    failed = False
+    print(f"corpus: {len(corpus)} sentences, {len(queries)} single queries")
+    print(f"{'backend':>10} {'load s':>8} {'sent/sec':>10} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'min cos':>8} {'mean cos':>8}")
+    for backend in ['torch'] + [b for b in args.backends if b != 'torch']:
+        start = time.perf_counter()
+        encoder = create_encoder(args.model, backend=backend, threads=args.threads,
+                                 interop_threads=args.interop_threads)
+        load_seconds = time.perf_counter() - start
+        encoder.encode(queries[:8])  # Warm-up
+
+        start = time.perf_counter()
+        embeddings = np.concatenate([encoder.encode(corpus[i:i + args.batch_size])
+                                     for i in range(0, len(corpus), args.batch_size)])
+        throughput = len(corpus) / (time.perf_counter() - start)
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            encoder.encode([query])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        # The float32 PyTorch encoder is the reference all others must match
+        normalized = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True),
+                                             1e-12)
+        if reference is None:
+            reference = normalized
+        cosines = np.sum(normalized * reference, axis=1)
+        failed |= backend in args.backends and cosines.min() < args.min_cosine
+
+        if backend in args.backends:
+            print(f"{backend:>10} {load_seconds:>8.1f} {throughput:>10.0f} "
+                  f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} "
+                  f"{cosines.min():>8.4f} {cosines.mean():>8.4f}")
+
+    if failed:
+        print(f"parity check failed: minimum cosine below {args.min_cosine}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Measure the recall cost of scanning quantized embeddings.
+
+Compares an exact float32 cosine scan with float16 and int8 scans, each
+with and without exact float32 re-scoring of the best quantized hits.
+Reports recall@k against the exact scan, per-query latency and the bytes
+held per segment. Uses a synthetic clustered corpus by default, or stored
+embeddings with ``--embeddings data/segments/<id>/<seg>.emb``.
+
+    python benchmarks/quantization_benchmark.py --rows 200000 --k 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.ann import cosine_rows, semantic_similarities
+from app.quantize import QUANTIZATION_KINDS, QuantizedEmbeddings
+from app.store import open_embedding_file
+
+def make_corpus(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Gaussian mixture, which is roughly how sentence embeddings cluster by topic"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    return centers[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+
+def top_k(similarities: np.ndarray, k: int) -> np.ndarray:
+    return np.argpartition(-similarities, k - 1)[:k]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--clusters', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--rescore', type=int, nargs='+', default=[0, 10, 50])
+    parser.add_argument('--embeddings', type=Path, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed + 1)
+    if args.embeddings:
+        embeddings = open_embedding_file(args.embeddings)
+    else:
+        embeddings = make_corpus(args.rows, args.dim, args.clusters, args.seed)
+
+    # Queries are noisy copies of corpus rows, like paraphrased questions
+    picks = rng.integers(0, len(embeddings), args.queries)
+    queries = np.asarray(embeddings[picks], dtype=np.float32)
+    queries += 0.3 * queries.std() * rng.standard_normal(queries.shape).astype(np.float32)
+
+    start = time.perf_counter()
+    truth = [set(top_k(semantic_similarities(embeddings, q), args.k)) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    exact_bytes = len(embeddings) * embeddings.shape[1] * 4
+
+    print(f"corpus: {len(embeddings)} x {embeddings.shape[1]}")
+    print(f"{'mode':>18} {'recall@' + str(args.k):>10} {'ms/query':>10} {'MB':>8} {'ratio':>6}")
+    print(f"{'float32':>18} {1.0:>10.3f} {exact_ms:>10.2f} {exact_bytes / 2**20:>8.1f} {1.0:>6.1f}")
+
+    for kind in QUANTIZATION_KINDS:
+        quantized = QuantizedEmbeddings.quantize(embeddings, kind)
+        for rescore in args.rescore:
+            hits = 0
+            start = time.perf_counter()
+            for query, expected in zip(queries, truth):
+                similarities = quantized.similarities(query)
+                if rescore:
+                    best = top_k(similarities, rescore)
+                    similarities[best] = cosine_rows(embeddings, query, best)
+                hits += len(expected & set(top_k(similarities, args.k)))
+            ms = (time.perf_counter() - start) * 1000 / len(queries)
+            recall = hits / (args.k * len(queries))
+            label = f"{kind}+rescore{rescore}" if rescore else kind
+            print(f"{label:>18} {recall:>10.3f} {ms:>10.2f} "
+                  f"{quantized.nbytes / 2**20:>8.1f} {exact_bytes / quantized.nbytes:>6.1f}")
+
+if __name__ == '__main__':
+    main()
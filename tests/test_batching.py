@@ -0,0 +1,35 @@
+import threading
+import unittest
+import numpy as np
+from app.batching import EmbeddingBatcher
+
+class CancelledRequestTest(unittest.TestCase):
+    def test_cancel_before_encode_keeps_worker_alive(self):
+        encoding = threading.Event()
+        release = threading.Event()
+
+        def encode(texts):
+            encoding.set()
+            release.wait(5)
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=1)
+        blocking = batcher.submit("first")
+        self.assertTrue(encoding.wait(5))           # Worker is now stuck encoding "first"
+        cancelled = batcher.submit("cancel me")     # Still queued for the next batch
+        self.assertTrue(cancelled.cancel())
+        release.set()
+
+        self.assertEqual(blocking.result(timeout=5).shape, (4,))
+        self.assertEqual(batcher.submit("after").result(timeout=5).shape, (4,))
+        self.assertTrue(batcher._worker.is_alive())
+
+    def test_cancel_after_claim_is_harmless(self):
+        batcher = EmbeddingBatcher(lambda texts: np.zeros((len(texts), 2)), max_wait_ms=1)
+        future = batcher.submit("a")
+        if not future.cancel():  # Fails once the worker has claimed it
+            future.result(timeout=5)
+        self.assertEqual(batcher.submit("b").result(timeout=5).shape, (2,))
+
+if __name__ == '__main__':
+    unittest.main()
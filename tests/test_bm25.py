@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+from app.bm25 import SparseBM25
+
+try:
+    from rank_bm25 import BM25Okapi
+except ImportError:
+    BM25Okapi = None
+
+def random_corpus(rng: np.random.Generator, docs: int, vocabulary: int):
+    """Zipf-distributed tokens, so some terms are common enough to get negative idf"""
+    words = [f"w{i}" for i in range(vocabulary)]
+    return [[words[min(rank, vocabulary) - 1] for rank in rng.zipf(1.3, rng.integers(1, 40))]
+            for _ in range(docs)]
+
+def random_query(rng: np.random.Generator, corpus):
+    tokens = [rng.choice(corpus[rng.integers(len(corpus))]) for _ in range(rng.integers(1, 6))]
+    return [str(token) for token in tokens] + ["unseen"]
+
+@unittest.skipIf(BM25Okapi is None, "needs rank_bm25")
+class BM25ParityTest(unittest.TestCase):
+    """SparseBM25 must score exactly like rank_bm25.BM25Okapi"""
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def cases(self, rounds: int = 20):
+        for _ in range(rounds):
+            corpus = random_corpus(self.rng, int(self.rng.integers(1, 300)),
+                                   int(self.rng.integers(5, 500)))
+            yield corpus, BM25Okapi(corpus), SparseBM25.build(corpus)
+
+    def test_get_scores(self):
+        for corpus, reference, bm25 in self.cases():
+            for _ in range(5):
+                query = random_query(self.rng, corpus)
+                np.testing.assert_allclose(bm25.get_scores(query), reference.get_scores(query),
+                                           rtol=0, atol=1e-12)
+
+    def test_get_batch_scores(self):
+        for corpus, reference, bm25 in self.cases():
+            doc_ids = np.flatnonzero(self.rng.random(len(corpus)) < 0.3)
+            query = random_query(self.rng, corpus)
+            np.testing.assert_allclose(bm25.get_batch_scores(query, doc_ids),
+                                       reference.get_batch_scores(query, doc_ids.tolist()),
+                                       rtol=0, atol=1e-12)
+
+    def test_top_k_matches_full_scan(self):
+        for corpus, reference, bm25 in self.cases():
+            exclude = self.rng.random(len(corpus)) < 0.2
+            for _ in range(5):
+                query = random_query(self.rng, corpus)
+                k = int(self.rng.integers(1, 20))
+                scores = reference.get_scores(query)
+                scores[exclude] = 0
+                expected = np.sort(scores[scores != 0])[::-1][:k]
+
+                for dense_ratio in (np.inf, 0.0):  # Pruned and dense paths
+                    doc_ids, top_scores = bm25.top_k(query, k, exclude, dense_ratio)
+                    np.testing.assert_allclose(top_scores, expected, rtol=0, atol=1e-9)
+                    np.testing.assert_allclose(scores[doc_ids], top_scores, rtol=0, atol=1e-9)
+                    self.assertFalse(exclude[doc_ids].any())
+
+    def test_restores_saved_state_and_bm25okapi_pickles(self):
+        corpus, reference, bm25 = next(self.cases(1))
+        query = random_query(self.rng, corpus)
+        for restored in (SparseBM25.from_state(bm25.to_state()),
+                         SparseBM25.from_state(reference.__dict__)):
+            np.testing.assert_allclose(restored.get_scores(query), reference.get_scores(query),
+                                       rtol=0, atol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import importlib.util
+import tempfile
+import unittest
+import numpy as np
+from app.encoders import create_encoder
+
+MODEL = 'all-MiniLM-L6-v2'
+MIN_COSINE = 0.98  # Same bar as benchmarks/encoder_benchmark.py --min-cosine
+
+SENTENCES = [
+    "How do I return an item I bought last week?",
+    "Our refund policy allows returns within 30 days of delivery.",
+    "Shipping is free for orders over fifty dollars.",
+    "Reset your password from the account settings page.",
+    "The warranty covers manufacturing defects for two years.",
+    "Invoices are emailed on the first business day of each month.",
+    "short",
+    "A much longer sentence about upgrading a subscription plan, changing the billing "
+    "address and contacting customer support by phone or email during business hours.",
+]
+
+def installed(*modules: str) -> bool:
+    return all(importlib.util.find_spec(module) is not None for module in modules)
+
+def normalized(embeddings: np.ndarray) -> np.ndarray:
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+@unittest.skipUnless(installed('torch', 'sentence_transformers'),
+                     "needs torch and sentence_transformers")
+class EncoderParityTest(unittest.TestCase):
+    """Every backend's embeddings stay close to the float32 PyTorch reference"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.reference = normalized(create_encoder(MODEL, backend='torch').encode(SENTENCES))
+        cls.model_dir = tempfile.mkdtemp()
+
+    def assert_parity(self, backend: str):
+        encoder = create_encoder(MODEL, backend=backend, model_dir=self.model_dir)
+        embeddings = encoder.encode(SENTENCES)
+        self.assertEqual(embeddings.shape, self.reference.shape)
+        self.assertEqual(embeddings.dtype, np.float32)
+        cosines = np.sum(normalized(embeddings) * self.reference, axis=1)
+        self.assertGreaterEqual(cosines.min(), MIN_COSINE, f"{backend}: {cosines}")
+
+    def test_torch_int8(self):
+        self.assert_parity('torch-int8')
+
+    @unittest.skipUnless(installed('onnxruntime', 'transformers'), "needs onnxruntime")
+    def test_onnx(self):
+        self.assert_parity('onnx')
+
+    @unittest.skipUnless(installed('onnxruntime', 'transformers'), "needs onnxruntime")
+    def test_onnx_int8(self):
+        self.assert_parity('onnx-int8')
+
+class CreateEncoderTest(unittest.TestCase):
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            create_encoder(MODEL, backend='tensorrt')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from app.chunks import ChunkStore
+from app.index import CompanyIndex, Segment, new_segment_id
+
+def make_segment(index, texts, source):
+    chunk_ids = index.allocate_chunk_ids(len(texts))
+    embeddings = np.random.default_rng(len(texts)).normal(size=(len(texts), 4)).astype(np.float32)
+    return Segment.build(new_segment_id(), chunk_ids,
+                         ChunkStore.build(texts, [source] * len(texts)), embeddings)
+
+class CompanyIndexTest(unittest.TestCase):
+    def test_merge_keeps_chunks_resolvable_when_added_out_of_id_order(self):
+        index = CompanyIndex()
+        first = make_segment(index, ["x one", "x two"], "x.txt")
+        second = make_segment(index, ["y one", "y two"], "y.txt")
+        index.add_segment(second)  # Finished embedding first
+        index.add_segment(first)
+
+        merged, removed = index.merge()
+        self.assertEqual(list(merged.chunk_ids), [0, 1, 2, 3])
+        self.assertEqual(len(removed), 2)
+        self.assertEqual(index.get_chunk(0), ("x one", "x.txt"))
+        self.assertEqual(index.get_chunk(3), ("y two", "y.txt"))
+        np.testing.assert_array_equal(merged.embeddings[2], second.embeddings[0])
+
+    def test_tombstoned_sources_are_hidden_and_dropped_by_merge(self):
+        index = CompanyIndex()
+        index.add_segment(make_segment(index, ["a one", "a two"], "a.txt"))
+        index.add_segment(make_segment(index, ["b one"], "b.txt"))
+        self.assertEqual(index.delete_sources(["a.txt"]), 2)
+        self.assertIsNone(index.get_chunk(0))
+        self.assertEqual(index.live_sources(), ["b.txt"])
+
+        merged, _ = index.merge()
+        self.assertEqual(list(merged.chunk_ids), [2])
+        self.assertEqual(index.get_chunk(2), ("b one", "b.txt"))
+
+    def test_reupload_replaces_older_chunks_of_the_source(self):
+        index = CompanyIndex()
+        index.add_segment(make_segment(index, ["old"], "a.txt"))
+        self.assertEqual(index.add_segment(make_segment(index, ["new"], "a.txt")), 1)
+        self.assertIsNone(index.get_chunk(0))
+        self.assertEqual(index.get_chunk(1), ("new", "a.txt"))
+
+    def test_replace_tombstones_older_chunks_when_segment_is_added(self):
+        index = CompanyIndex()
+        index.add_segment(make_segment(index, ["a"], "a.txt"))
+        segment = make_segment(index, ["b"], "b.txt")
+        self.assertEqual(index.live_sources(), ["a.txt"])  # Untouched until added
+        index.add_segment(segment, replace=True)
+        self.assertEqual(index.live_sources(), ["b.txt"])
+
+    def test_failed_persist_abandons_merge(self):
+        index = CompanyIndex()
+        index.add_segment(make_segment(index, ["a"], "a.txt"))
+        index.add_segment(make_segment(index, ["b"], "b.txt"))
+        self.assertIsNone(index.merge(persist=lambda merged: False))
+        self.assertEqual(len(index.segments), 2)
+        self.assertFalse(index.merging)
+
+if __name__ == '__main__':
+    unittest.main()
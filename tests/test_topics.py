@@ -0,0 +1,47 @@
+import threading
+import unittest
+from app.topics import TopicLabeler
+
+class TopicLabelerTest(unittest.TestCase):
+    def test_batch_is_labelled_in_one_call(self):
+        calls = []
+        done = threading.Event()
+        topics = {}
+
+        def label_batch(interactions):
+            calls.append(len(interactions))
+            return [f"topic {query}" for query, _ in interactions]
+
+        def callback(query):
+            def record(topic):
+                topics[query] = topic
+                if len(topics) == 3:
+                    done.set()
+            return record
+
+        labeler = TopicLabeler(label_batch, lambda query: "fallback", max_wait_ms=200)
+        for query in ("a", "b", "c"):
+            labeler.submit(query, "context", callback(query))
+        self.assertTrue(done.wait(5))
+        self.assertEqual(topics, {"a": "topic a", "b": "topic b", "c": "topic c"})
+        self.assertEqual(calls, [3])
+
+    def test_failing_fallback_keeps_worker_alive(self):
+        failing = threading.Event()
+
+        def label_batch(interactions):
+            if interactions[0][0] == " ":
+                failing.set()
+                raise RuntimeError("LLM unavailable")
+            return ["billing"] * len(interactions)
+
+        labelled = threading.Event()
+        labeler = TopicLabeler(label_batch, lambda query: query.split()[0], max_wait_ms=1)
+        labeler.submit(" ", "context", lambda topic: None)  # Fallback raises IndexError
+        self.assertTrue(failing.wait(5))
+        labeler.submit("invoice", "context", lambda topic: labelled.set())
+        self.assertTrue(labelled.wait(5))
+        self.assertTrue(labeler._worker.is_alive())
+
+if __name__ == '__main__':
+    unittest.main()